@@ -1,628 +1,418 @@
 from __future__ import annotations
 
+import atexit
+import os
 import random
-from dataclasses import dataclass, asdict
-from typing import Dict, List
-
-from flask import Flask, jsonify, request
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from flask import Flask, Response, g, has_request_context, jsonify, request
 from flask_cors import CORS
 
+from battle import BattleStore, resolve_turn
+from box import Box
+from catalog_cache import encode_json, strong_etag
+from catalog_registry import CatalogGeneration, CatalogRegistry
+from changelog import ChangeLog
+from encounters import EncounterCache
+from events import EventHub
+from journal import Journal
+from leaderboard import BOARDS, EFFICIENCY_SCALE, Leaderboards, public_id
+from matchmaking import MAX_LEVEL
+from matchups import TRIAL_PRESETS, MatchupCache
+from metrics import Metrics, SamplingProfiler
+from search_index import SEARCH_FIELDS
+from sessions import SessionStore
+from sqlite_state import SQLiteStateStore
+from species_catalog import (
+    AREAS_SOURCE,
+    BIRD_FIELDS,
+    BIRDS_SOURCE,
+    COMPILED_PATH,
+    STAT_NAMES,
+    TIME_SLOTS,
+    WEATHER_TYPES,
+    Bird,
+)
+
 
 app = Flask(__name__)
 CORS(app)
 
 
-TIME_SLOTS = ["Dawn", "Midday", "Dusk", "Night"]
-WEATHER_TYPES = ["Clear", "Overcast", "Rain", "Windy", "Fog"]
-
-
-@dataclass
-class Bird:
-    id: str
-    name: str
-    category: str
-    size: str
-    habitats: List[str]
-    active_times: List[str]
-    weather: List[str]
-    rarity: str
-    temperament: str
-    catch_rate: int
-    traits: List[str]
-    description: str
-    stats: Dict[str, int]
-    moves: List[Dict[str, object]]
-
-
-BIRDS: List[Bird] = [
-    Bird(
-        id="northern-cardinal",
-        name="Northern Cardinal",
-        category="songbird",
-        size="small",
-        habitats=["woodland", "urban"],
-        active_times=["Dawn", "Midday"],
-        weather=["Clear", "Overcast"],
-        rarity="common",
-        temperament="bold",
-        catch_rate=70,
-        traits=["territorial", "melodic"],
-        description="A vivid songbird that patrols clearings with sharp calls.",
-        stats={
-            "HP": 85,
-            "Attack": 95,
-            "Special Attack": 70,
-            "Defense": 70,
-            "Special Defense": 65,
-            "Speed": 75,
-        },
-        moves=[
-            {"name": "Scarlet Peck", "power": 70, "category": "physical"},
-            {
-                "name": "Sunburst Aria",
-                "power": 0,
-                "category": "special",
-                "effect": "heal",
-                "amount": 35,
-            },
-            {"name": "Wing Gust", "power": 65, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="great-blue-heron",
-        name="Great Blue Heron",
-        category="wader",
-        size="large",
-        habitats=["wetland"],
-        active_times=["Dawn", "Dusk"],
-        weather=["Clear", "Overcast", "Fog"],
-        rarity="uncommon",
-        temperament="patient",
-        catch_rate=45,
-        traits=["stillness", "piercing gaze"],
-        description="A towering fisher that waits motionless before striking.",
-        stats={
-            "HP": 120,
-            "Attack": 80,
-            "Special Attack": 75,
-            "Defense": 105,
-            "Special Defense": 95,
-            "Speed": 55,
-        },
-        moves=[
-            {"name": "Harbor Spear", "power": 85, "category": "physical"},
-            {"name": "Marsh Pulse", "power": 75, "category": "special"},
-            {
-                "name": "Stillwater Guard",
-                "power": 0,
-                "category": "special",
-                "effect": "buff",
-                "stat": "Defense",
-                "amount": 20,
-            },
-        ],
-    ),
-    Bird(
-        id="peregrine-falcon",
-        name="Peregrine Falcon",
-        category="raptor",
-        size="medium",
-        habitats=["cliff", "urban"],
-        active_times=["Midday", "Dusk"],
-        weather=["Clear", "Windy"],
-        rarity="rare",
-        temperament="fierce",
-        catch_rate=25,
-        traits=["aerial dive", "keen sight"],
-        description="A swift raptor that dives like a bolt of lightning.",
-        stats={
-            "HP": 90,
-            "Attack": 120,
-            "Special Attack": 85,
-            "Defense": 80,
-            "Special Defense": 70,
-            "Speed": 130,
-        },
-        moves=[
-            {"name": "Sky Rend", "power": 95, "category": "physical"},
-            {"name": "Thermal Strike", "power": 85, "category": "special"},
-            {"name": "Stooping Dive", "power": 90, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="snowy-owl",
-        name="Snowy Owl",
-        category="raptor",
-        size="large",
-        habitats=["tundra"],
-        active_times=["Night", "Dusk"],
-        weather=["Clear", "Overcast", "Windy"],
-        rarity="rare",
-        temperament="silent",
-        catch_rate=30,
-        traits=["silent flight", "camouflage"],
-        description="A pale hunter that blends with frost and shadow.",
-        stats={
-            "HP": 110,
-            "Attack": 95,
-            "Special Attack": 90,
-            "Defense": 95,
-            "Special Defense": 110,
-            "Speed": 60,
-        },
-        moves=[
-            {"name": "Frost Talon", "power": 85, "category": "physical"},
-            {"name": "Moonlit Hex", "power": 90, "category": "special"},
-            {"name": "Silent Glide", "power": 70, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="american-crow",
-        name="American Crow",
-        category="corvid",
-        size="medium",
-        habitats=["woodland", "urban", "farmland"],
-        active_times=["Dawn", "Midday", "Dusk"],
-        weather=["Clear", "Overcast", "Windy"],
-        rarity="common",
-        temperament="clever",
-        catch_rate=60,
-        traits=["mimicry", "problem-solving"],
-        description="A clever corvid that remembers every encounter.",
-        stats={
-            "HP": 95,
-            "Attack": 85,
-            "Special Attack": 80,
-            "Defense": 80,
-            "Special Defense": 85,
-            "Speed": 90,
-        },
-        moves=[
-            {"name": "Caw Slash", "power": 75, "category": "physical"},
-            {
-                "name": "Riddle Cry",
-                "power": 0,
-                "category": "special",
-                "effect": "buff",
-                "stat": "Special Attack",
-                "amount": 20,
-            },
-            {"name": "Shadow Feint", "power": 65, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="ruby-throated-hummingbird",
-        name="Ruby-throated Hummingbird",
-        category="nectar-feeder",
-        size="tiny",
-        habitats=["woodland", "garden"],
-        active_times=["Dawn", "Midday"],
-        weather=["Clear", "Overcast"],
-        rarity="uncommon",
-        temperament="hyper",
-        catch_rate=50,
-        traits=["hover", "iridescent"],
-        description="A jewel that hovers in place and darts between flowers.",
-        stats={
-            "HP": 75,
-            "Attack": 70,
-            "Special Attack": 95,
-            "Defense": 60,
-            "Special Defense": 85,
-            "Speed": 115,
-        },
-        moves=[
-            {"name": "Nectar Beam", "power": 80, "category": "special"},
-            {"name": "Ruby Jab", "power": 65, "category": "physical"},
-            {
-                "name": "Whirl Sip",
-                "power": 0,
-                "category": "special",
-                "effect": "heal",
-                "amount": 30,
-            },
-        ],
-    ),
-    Bird(
-        id="belted-kingfisher",
-        name="Belted Kingfisher",
-        category="fisher",
-        size="small",
-        habitats=["wetland", "coast"],
-        active_times=["Midday"],
-        weather=["Clear", "Windy"],
-        rarity="uncommon",
-        temperament="alert",
-        catch_rate=55,
-        traits=["hover", "rattle call"],
-        description="A fish hunter with a rattling call and sharp dives.",
-        stats={
-            "HP": 85,
-            "Attack": 90,
-            "Special Attack": 75,
-            "Defense": 80,
-            "Special Defense": 70,
-            "Speed": 85,
-        },
-        moves=[
-            {"name": "River Dart", "power": 80, "category": "physical"},
-            {"name": "Rattle Shot", "power": 70, "category": "special"},
-            {"name": "Splashline", "power": 65, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="scarlet-tanager",
-        name="Scarlet Tanager",
-        category="songbird",
-        size="small",
-        habitats=["woodland"],
-        active_times=["Dawn", "Midday"],
-        weather=["Clear"],
-        rarity="rare",
-        temperament="shy",
-        catch_rate=35,
-        traits=["canopy dweller", "bright plumage"],
-        description="A flash of red high in the canopy, quick to vanish.",
-        stats={
-            "HP": 80,
-            "Attack": 85,
-            "Special Attack": 105,
-            "Defense": 65,
-            "Special Defense": 80,
-            "Speed": 95,
-        },
-        moves=[
-            {"name": "Crimson Pulse", "power": 90, "category": "special"},
-            {"name": "Canopy Slice", "power": 75, "category": "physical"},
-            {"name": "Sunflare Hymn", "power": 80, "category": "special"},
-        ],
-    ),
-    Bird(
-        id="osprey",
-        name="Osprey",
-        category="raptor",
-        size="large",
-        habitats=["coast", "wetland"],
-        active_times=["Dawn", "Midday"],
-        weather=["Clear", "Windy"],
-        rarity="uncommon",
-        temperament="focused",
-        catch_rate=40,
-        traits=["fish hunter", "hover dive"],
-        description="A coastal hunter that locks onto fish with laser focus.",
-        stats={
-            "HP": 105,
-            "Attack": 110,
-            "Special Attack": 70,
-            "Defense": 95,
-            "Special Defense": 75,
-            "Speed": 80,
-        },
-        moves=[
-            {"name": "Harpoon Dive", "power": 90, "category": "physical"},
-            {"name": "Salt Spray", "power": 70, "category": "special"},
-            {"name": "Talon Clamp", "power": 75, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="sandhill-crane",
-        name="Sandhill Crane",
-        category="wader",
-        size="large",
-        habitats=["wetland", "farmland"],
-        active_times=["Dawn", "Dusk"],
-        weather=["Clear", "Overcast", "Fog"],
-        rarity="uncommon",
-        temperament="regal",
-        catch_rate=45,
-        traits=["trumpet call", "courtship dance"],
-        description="A towering dancer whose calls echo across the marsh.",
-        stats={
-            "HP": 115,
-            "Attack": 85,
-            "Special Attack": 90,
-            "Defense": 100,
-            "Special Defense": 95,
-            "Speed": 70,
-        },
-        moves=[
-            {"name": "Marsh Waltz", "power": 80, "category": "special"},
-            {"name": "Reed Lance", "power": 85, "category": "physical"},
-            {
-                "name": "Trumpet Shock",
-                "power": 0,
-                "category": "special",
-                "effect": "buff",
-                "stat": "Special Defense",
-                "amount": 15,
-            },
-        ],
-    ),
-    Bird(
-        id="bald-eagle",
-        name="Bald Eagle",
-        category="raptor",
-        size="large",
-        habitats=["coast", "woodland"],
-        active_times=["Midday", "Dusk"],
-        weather=["Clear", "Windy"],
-        rarity="rare",
-        temperament="dominant",
-        catch_rate=30,
-        traits=["soaring", "fearless"],
-        description="A commanding raptor that surveys the land from above.",
-        stats={
-            "HP": 110,
-            "Attack": 125,
-            "Special Attack": 80,
-            "Defense": 95,
-            "Special Defense": 85,
-            "Speed": 90,
-        },
-        moves=[
-            {"name": "Liberty Strike", "power": 95, "category": "physical"},
-            {"name": "Skybreaker", "power": 90, "category": "physical"},
-            {"name": "Thunder Gaze", "power": 80, "category": "special"},
-        ],
-    ),
-    Bird(
-        id="pileated-woodpecker",
-        name="Pileated Woodpecker",
-        category="woodland",
-        size="medium",
-        habitats=["woodland"],
-        active_times=["Dawn", "Midday"],
-        weather=["Clear", "Overcast"],
-        rarity="uncommon",
-        temperament="relentless",
-        catch_rate=55,
-        traits=["drumming", "tree climber"],
-        description="A powerful drummer that chisels resonant tree hollows.",
-        stats={
-            "HP": 90,
-            "Attack": 110,
-            "Special Attack": 70,
-            "Defense": 85,
-            "Special Defense": 70,
-            "Speed": 85,
-        },
-        moves=[
-            {"name": "Timber Strike", "power": 85, "category": "physical"},
-            {"name": "Resonant Tap", "power": 70, "category": "special"},
-            {"name": "Bark Split", "power": 80, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="barn-swallow",
-        name="Barn Swallow",
-        category="songbird",
-        size="small",
-        habitats=["farmland", "urban"],
-        active_times=["Midday", "Dusk"],
-        weather=["Clear", "Windy"],
-        rarity="common",
-        temperament="nimble",
-        catch_rate=65,
-        traits=["acrobat", "insect hunter"],
-        description="A swift flier that skims fields with sharp turns.",
-        stats={
-            "HP": 80,
-            "Attack": 75,
-            "Special Attack": 80,
-            "Defense": 65,
-            "Special Defense": 70,
-            "Speed": 115,
-        },
-        moves=[
-            {"name": "Sky Stitch", "power": 70, "category": "physical"},
-            {"name": "Jetstream", "power": 80, "category": "special"},
-            {"name": "Needle Dive", "power": 75, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="red-tailed-hawk",
-        name="Red-tailed Hawk",
-        category="raptor",
-        size="large",
-        habitats=["woodland", "farmland"],
-        active_times=["Midday", "Dusk"],
-        weather=["Clear", "Windy", "Overcast"],
-        rarity="uncommon",
-        temperament="watchful",
-        catch_rate=45,
-        traits=["circling", "keen sight"],
-        description="A patient hunter that circles fields before swooping in.",
-        stats={
-            "HP": 100,
-            "Attack": 115,
-            "Special Attack": 75,
-            "Defense": 90,
-            "Special Defense": 80,
-            "Speed": 90,
-        },
-        moves=[
-            {"name": "Thermal Dive", "power": 90, "category": "physical"},
-            {"name": "Raptor Cry", "power": 75, "category": "special"},
-            {"name": "Sky Talon", "power": 85, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="atlantic-puffin",
-        name="Atlantic Puffin",
-        category="seabird",
-        size="small",
-        habitats=["coast"],
-        active_times=["Dawn", "Midday"],
-        weather=["Clear", "Windy", "Overcast"],
-        rarity="uncommon",
-        temperament="playful",
-        catch_rate=60,
-        traits=["colorful beak", "diver"],
-        description="A quirky cliff diver that rockets beneath the waves.",
-        stats={
-            "HP": 95,
-            "Attack": 80,
-            "Special Attack": 85,
-            "Defense": 90,
-            "Special Defense": 80,
-            "Speed": 80,
-        },
-        moves=[
-            {"name": "Cliff Skimmer", "power": 75, "category": "physical"},
-            {"name": "Brine Burst", "power": 80, "category": "special"},
-            {"name": "Pebble Peck", "power": 70, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="black-capped-chickadee",
-        name="Black-capped Chickadee",
-        category="songbird",
-        size="tiny",
-        habitats=["woodland", "urban"],
-        active_times=["Dawn", "Midday"],
-        weather=["Clear", "Overcast", "Windy"],
-        rarity="common",
-        temperament="curious",
-        catch_rate=70,
-        traits=["chirp", "caching"],
-        description="A tiny explorer that chatters and hops between branches.",
-        stats={
-            "HP": 75,
-            "Attack": 70,
-            "Special Attack": 85,
-            "Defense": 60,
-            "Special Defense": 75,
-            "Speed": 105,
-        },
-        moves=[
-            {"name": "Chirp Dart", "power": 65, "category": "special"},
-            {"name": "Seed Flick", "power": 70, "category": "physical"},
-            {"name": "Quickstep", "power": 75, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="prairie-falcon",
-        name="Prairie Falcon",
-        category="raptor",
-        size="medium",
-        habitats=["cliff", "farmland"],
-        active_times=["Midday", "Dusk"],
-        weather=["Clear", "Windy"],
-        rarity="rare",
-        temperament="restless",
-        catch_rate=30,
-        traits=["wind rider", "swift dive"],
-        description="A desert sprinter that thrives on rushing winds.",
-        stats={
-            "HP": 90,
-            "Attack": 110,
-            "Special Attack": 80,
-            "Defense": 80,
-            "Special Defense": 75,
-            "Speed": 115,
-        },
-        moves=[
-            {"name": "Sirocco Dive", "power": 90, "category": "physical"},
-            {"name": "Sandflash", "power": 80, "category": "special"},
-            {"name": "Horizon Slash", "power": 85, "category": "physical"},
-        ],
-    ),
-    Bird(
-        id="common-loon",
-        name="Common Loon",
-        category="seabird",
-        size="large",
-        habitats=["wetland", "coast"],
-        active_times=["Dusk", "Night"],
-        weather=["Clear", "Fog", "Overcast"],
-        rarity="rare",
-        temperament="mystic",
-        catch_rate=35,
-        traits=["haunting call", "deep diver"],
-        description="A midnight diver whose calls echo across glassy water.",
-        stats={
-            "HP": 110,
-            "Attack": 85,
-            "Special Attack": 110,
-            "Defense": 95,
-            "Special Defense": 95,
-            "Speed": 60,
-        },
-        moves=[
-            {"name": "Echo Spiral", "power": 90, "category": "special"},
-            {"name": "Midnight Dive", "power": 85, "category": "physical"},
-            {
-                "name": "Lakeglow",
-                "power": 0,
-                "category": "special",
-                "effect": "heal",
-                "amount": 40,
-            },
-        ],
-    ),
-]
-
-
-AREAS = [
-    {
-        "id": "whispering-woods",
-        "name": "Whispering Woods",
-        "habitats": ["woodland", "garden"],
-        "icon": "🌲",
-        "background": "forest",
-    },
-    {
-        "id": "mirror-marsh",
-        "name": "Mirror Marsh",
-        "habitats": ["wetland"],
-        "icon": "🪷",
-        "background": "wetland",
-    },
-    {
-        "id": "sunset-cliffs",
-        "name": "Sunset Cliffs",
-        "habitats": ["cliff", "coast"],
-        "icon": "⛰️",
-        "background": "cliff",
-    },
-    {
-        "id": "city-canopy",
-        "name": "City Canopy",
-        "habitats": ["urban"],
-        "icon": "🏙️",
-        "background": "urban",
-    },
-]
-
-
-state: Dict[str, object] = {
-    "time_index": 0,
-    "area_weather": {},
-    "team": [],
-    "box": [],
-    "dex": set(),
-    "levels": {},
-    "net_attempts": 0,
-}
-
-def roll_weather() -> Dict[str, str]:
-    return {area["id"]: random.choice(WEATHER_TYPES) for area in AREAS}
-
-
-def reset_state() -> None:
+CATALOG_PATH = os.environ.get("BIRDMON_CATALOG", COMPILED_PATH)
+catalogs = CatalogRegistry(CATALOG_PATH)
+# Seconds between checks of the catalog files; a change is built into a new
+# generation in the background and swapped in. Unset or 0 disables it.
+CATALOG_WATCH = float(os.environ.get("BIRDMON_CATALOG_WATCH") or 0)
+if CATALOG_WATCH > 0:
+    watched = [CATALOG_PATH]
+    if CATALOG_PATH == COMPILED_PATH:
+        watched += [BIRDS_SOURCE, AREAS_SOURCE]
+    catalogs.watch(watched, CATALOG_WATCH)
+
+
+def current_catalog() -> CatalogGeneration:
+    """The generation this request started on (the live one outside requests)."""
+    return g.catalog if has_request_context() else catalogs.current
+
+
+SESSION_COOKIE = "birdmon_session"
+SESSION_HEADER = "X-Session-Id"
+MAX_BATCH_THROWS = 100
+BOX_PAGE_SIZE = 100
+MAX_BOX_PAGE_SIZE = 500
+CATALOG_PAGE_SIZE = 200
+MAX_CATALOG_PAGE_SIZE = 5000
+# Bytes per write when sending a slice of the mapped catalog.
+RESPONSE_CHUNK_SIZE = 64 * 1024
+LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
+# Nets a player must have thrown before they are ranked on capture efficiency.
+EFFICIENCY_MIN_NETS = 20
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+DATA_DIR = os.environ.get(
+    "BIRDMON_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+)
+
+
+def roll_weather(rng=random) -> Dict[str, str]:
+    return {area["id"]: rng.choice(WEATHER_TYPES) for area in current_catalog().areas}
+
+
+def reset_state(state: Dict[str, object], rng=random) -> None:
     state["time_index"] = 0
-    state["area_weather"] = roll_weather()
+    state["area_weather"] = roll_weather(rng)
+    state["encounter_seed"] = rng.getrandbits(32)
     state["team"] = []
-    state["box"] = []
+    state["box"] = Box()
     state["dex"] = set()
     state["levels"] = {}
     state["net_attempts"] = 0
+    state["nets_thrown"] = 0
+    state["captures"] = 0
+    # Per-group dex counters, built on first use (see collection_progress).
+    state["progress"] = None
+    # Held birds per level, built on first use (see level_counts).
+    state["level_counts"] = None
+    if "changes" in state:
+        state["changes"].reset()
+    else:
+        state["changes"] = ChangeLog()
+
+
+# "memory" keeps sessions in this process (journaled when DATA_DIR is set);
+# "sqlite" shares them between worker processes through BIRDMON_STATE_DB.
+STATE_BACKEND = os.environ.get("BIRDMON_STATE_BACKEND", "memory")
+STATE_DB = os.environ.get(
+    "BIRDMON_STATE_DB", os.path.join(DATA_DIR or ".", "state.sqlite3")
+)
+if STATE_BACKEND not in ("memory", "sqlite"):
+    raise ValueError(f"unknown BIRDMON_STATE_BACKEND {STATE_BACKEND!r}")
+
+journal = Journal(DATA_DIR) if DATA_DIR and STATE_BACKEND == "memory" else None
+if journal:
+    atexit.register(journal.close)
+
+
+event_hub = EventHub()
+
+
+def record_progress(event: Dict[str, object], notify: bool = True) -> None:
+    # Outside a request (the offline simulator) there is no session to
+    # journal or notify.
+    if not has_request_context():
+        return
+    if journal:
+        journal.record(g.session_id, event)
+    if notify:
+        event_hub.publish(g.session_id, "player", event)
+
+
+def new_player_state(session_id: str) -> Dict[str, object]:
+    state: Dict[str, object] = {}
+    reset_state(state)
+    progress = journal.load(session_id) if journal else None
+    if progress:
+        state["team"] = progress["team"]
+        state["box"] = progress["box"]
+        state["dex"] = set(progress["dex"])
+        state["levels"] = progress["levels"]
+        state["nets_thrown"] = progress["nets_thrown"]
+        state["captures"] = progress["captures"]
+    return state
+
+
+if STATE_BACKEND == "sqlite":
+    sessions = SQLiteStateStore(STATE_DB, new_player_state)
+else:
+    sessions = SessionStore(new_player_state)
+battles = BattleStore()
+matchup_cache = MatchupCache()
+encounters = EncounterCache()
+leaderboards = Leaderboards()
+metrics = Metrics()
+metrics.describe("birdmon_request_seconds", "histogram", "Request latency by route.")
+metrics.describe("birdmon_span_seconds", "histogram", "Time spent in named spans.")
+metrics.describe("birdmon_captures_total", "counter", "Net throws by outcome.")
+metrics.describe("birdmon_battles_total", "counter", "Battles by lifecycle event.")
+metrics.describe("birdmon_encounters_total", "counter", "Encounter cache lookups.")
+profiler = SamplingProfiler()
+if os.environ.get("BIRDMON_PROFILE"):
+    profiler.start()
+
+
+@app.before_request
+def pin_catalog():
+    g.catalog = catalogs.current
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if profiler.running:
+        profiler.begin()
+
+
+@app.after_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_started
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe(
+        "birdmon_request_seconds",
+        elapsed,
+        route=route,
+        method=request.method,
+        status=str(response.status_code),
+    )
+    if profiler.running:
+        profiler.end(f"{request.method} {route}", elapsed)
+    return response
+
+
+@app.before_request
+def resolve_session():
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(
+        SESSION_COOKIE
+    )
+    g.new_session = not (session_id and SESSION_ID_PATTERN.match(session_id))
+    g.session_id = uuid.uuid4().hex if g.new_session else session_id
+
+
+@app.after_request
+def issue_session_cookie(response):
+    if g.get("new_session"):
+        response.set_cookie(SESSION_COOKIE, g.session_id, httponly=True, samesite="Lax")
+    return response
+
+
+def player_session(write: bool = True):
+    """The player's state; routes that only read pass ``write=False``."""
+    return sessions.session(g.session_id, write)
+
+
+def player_scores(state: Dict[str, object]) -> Dict[str, Optional[int]]:
+    """Leaderboard scores; None keeps the player off a board."""
+    captures = state.get("captures", 0)
+    nets = state.get("nets_thrown", 0)
+    counts = level_counts(state)
+    top_level = next((level for level in range(MAX_LEVEL, 0, -1) if counts[level]), 0)
+    return {
+        "dex": len(state["dex"]) or None,
+        "level": top_level or None,
+        "captures": captures or None,
+        "efficiency": (
+            captures * EFFICIENCY_SCALE // nets if nets >= EFFICIENCY_MIN_NETS else None
+        ),
+    }
+
+
+def collection_progress(state: Dict[str, object]) -> Dict[str, int]:
+    """Dex entries per collection group (``"kind:value"`` -> count).
+
+    The counters are kept in the player's state and bumped as the dex
+    grows; they are rebuilt from the dex only when they were counted
+    against a different catalog, or never counted at all.
+    """
+    catalog = current_catalog()
+    progress = state.get("progress")
+    if not progress or progress["catalog"] != catalog.etag:
+        counts: Dict[str, int] = {}
+        for bird_id in state["dex"]:
+            bird = catalog.species(bird_id)
+            if bird:
+                for key in catalog.progress.keys(bird):
+                    counts[key] = counts.get(key, 0) + 1
+        progress = state["progress"] = {"catalog": catalog.etag, "counts": counts}
+    return progress["counts"]
+
+
+def level_counts(state: Dict[str, object]) -> List[int]:
+    """How many held birds are at each level (index), capped at MAX_LEVEL.
+
+    Levels are kept only for birds in the team or box, and only catalog
+    birds count. Like the collection counters, the histogram lives in the
+    player's state, is kept up to date by ``set_level`` and is rebuilt from
+    the levels only when it was counted against a different catalog.
+    """
+    catalog = current_catalog()
+    counts = state.get("level_counts")
+    if not counts or counts["catalog"] != catalog.etag:
+        histogram = [0] * (MAX_LEVEL + 1)
+        for bird_id, level in state["levels"].items():
+            if catalog.species(bird_id):
+                histogram[min(MAX_LEVEL, level)] += 1
+        counts = state["level_counts"] = {"catalog": catalog.etag, "levels": histogram}
+    return counts["levels"]
+
+
+def set_level(state: Dict[str, object], bird_id: str, level: Optional[int]) -> None:
+    """Set a bird's level, or drop it with None, and log the change."""
+    histogram = level_counts(state)
+    levels = state["levels"]
+    if current_catalog().species(bird_id):
+        if bird_id in levels:
+            histogram[min(MAX_LEVEL, levels[bird_id])] -= 1
+        if level is not None:
+            histogram[min(MAX_LEVEL, level)] += 1
+    if level is None:
+        del levels[bird_id]
+    else:
+        levels[bird_id] = level
+    state["changes"].record("level", bird_id, level)
+
+
+def add_to_dex(state: Dict[str, object], bird: Bird) -> None:
+    counts = collection_progress(state)
+    state["dex"].add(bird.id)
+    state["changes"].record("dex", bird.id)
+    for key in current_catalog().progress.keys(bird):
+        counts[key] = counts.get(key, 0) + 1
+
+
+def record_scores(state: Dict[str, object]) -> None:
+    # Like record_progress, only requests have a player to rank. The SQLite
+    # store saves the scores with the state and every worker's boards pick
+    # them up from there (see sync_leaderboards).
+    if has_request_context():
+        scores = state["scores"] = player_scores(state)
+        if STATE_BACKEND == "memory":
+            leaderboards.update(g.session_id, scores)
+
+
+def sync_leaderboards() -> None:
+    """Bring the boards up to date with the scores persisted elsewhere.
+
+    With the SQLite store that is every worker's score rows since the last
+    sync. In memory the boards are complete once seeded: players journaled
+    by an earlier run are added unless this run has ranked them already.
+    """
+    if STATE_BACKEND == "sqlite":
+        leaderboards.sync(sessions.scores_since)
+    elif journal:
+        for session_id in journal.session_ids():
+            progress = journal.load(session_id)
+            if progress:
+                leaderboards.seed(session_id, player_scores(progress))
 
 
-reset_state()
+# Seed the boards off the request path; requests are served meanwhile.
+threading.Thread(target=sync_leaderboards, name="leaderboard-seed", daemon=True).start()
 
 
-def build_state_payload() -> Dict[str, object]:
+def read_payload() -> Dict[str, object]:
+    with metrics.span("parse_json"):
+        payload = request.get_json(silent=True)
+    return payload if isinstance(payload, dict) else {}
+
+
+def render_species(payload: Dict[str, object], **species) -> bytes:
+    with metrics.span("render_species"):
+        return current_catalog().cache.render(payload, **species)
+
+
+def player_payload(
+    state: Dict[str, object], cursor: int = 0, limit: int = BOX_PAGE_SIZE
+) -> Dict[str, object]:
+    box = state["box"]
+    entries, next_cursor = box.page(cursor, limit)
+    return {
+        "version": state["changes"].version,
+        "delta": False,
+        "team": state["team"],
+        "box": [bird_id for _, bird_id in entries],
+        "box_entries": [entry_id for entry_id, _ in entries],
+        "box_cursor": next_cursor,
+        "box_size": len(box),
+        "box_counts": box.counts(),
+        "dex": list(state["dex"]),
+        "levels": state["levels"],
+    }
+
+
+def player_delta(state: Dict[str, object], since: int) -> Optional[Dict[str, object]]:
+    """Changes after version ``since``, or None when a full payload is needed.
+
+    Box entries added and released within the window cancel out; levels map
+    to their latest value, with None for a level that was dropped.
+    """
+    changes = state["changes"].since(since)
+    if changes is None:
+        return None
+    added: Dict[int, str] = {}
+    removed: List[int] = []
+    touched = set()
+    dex: List[str] = []
+    levels: Dict[str, Optional[int]] = {}
+    team_changed = False
+    for kind, args in changes:
+        if kind == "box_add":
+            entry_id, bird_id = args
+            added[entry_id] = bird_id
+            touched.add(bird_id)
+        elif kind == "box_remove":
+            entry_id, bird_id = args
+            if added.pop(entry_id, None) is None:
+                removed.append(entry_id)
+            touched.add(bird_id)
+        elif kind == "team":
+            team_changed = True
+        elif kind == "dex":
+            dex.append(args[0])
+        elif kind == "level":
+            levels[args[0]] = args[1]
+    box = state["box"]
+    payload: Dict[str, object] = {
+        "version": state["changes"].version,
+        "since": since,
+        "delta": True,
+        "box_added": [[entry_id, bird_id] for entry_id, bird_id in added.items()],
+        "box_removed": removed,
+        "box_size": len(box),
+        "box_counts": {bird_id: box.count(bird_id) for bird_id in touched},
+        "dex_added": dex,
+        "levels": levels,
+    }
+    if team_changed:
+        payload["team"] = state["team"]
+    return payload
+
+
+def player_sync_payload(
+    state: Dict[str, object],
+    since: Optional[int],
+    cursor: int = 0,
+    limit: int = BOX_PAGE_SIZE,
+) -> Dict[str, object]:
+    delta = player_delta(state, since) if since is not None else None
+    return delta or player_payload(state, cursor, limit)
+
+
+def build_state_payload(state: Dict[str, object]) -> Dict[str, object]:
     return {
         "time_slot": TIME_SLOTS[state["time_index"]],
         "areas": [
@@ -630,66 +420,326 @@ def build_state_payload() -> Dict[str, object]:
                 **area,
                 "weather": state["area_weather"].get(area["id"], "Clear"),
             }
-            for area in AREAS
+            for area in current_catalog().areas
         ],
     }
 
 
-def bird_to_dict(bird: Bird) -> Dict[str, object]:
-    return asdict(bird)
+def buffer_chunks(body: memoryview) -> Iterator[bytes]:
+    for start in range(0, len(body), RESPONSE_CHUNK_SIZE):
+        yield bytes(body[start : start + RESPONSE_CHUNK_SIZE])
 
 
-def eligible_birds(area_id: str) -> List[Bird]:
-    area = next((area for area in AREAS if area["id"] == area_id), None)
-    if not area:
-        return []
+def json_bytes(body: Union[bytes, memoryview], etag: Optional[str] = None):
+    if isinstance(body, memoryview):
+        # Mapped catalog bytes go out a chunk at a time rather than being
+        # copied whole into the worker's heap.
+        response = app.response_class(buffer_chunks(body), mimetype="application/json")
+        response.content_length = len(body)
+    else:
+        response = app.response_class(body, mimetype="application/json")
+    if etag:
+        response.set_etag(etag)
+        response.make_conditional(request)
+    return response
+
+
+def projected_fields() -> Optional[List[str]]:
+    """The ``fields`` query parameter; [] when it names an unknown field."""
+    if "fields" not in request.args:
+        return None
+    fields = [field for field in request.args["fields"].split(",") if field]
+    return fields if all(field in BIRD_FIELDS for field in fields) else []
+
+
+def stream_species(cache, bird_ids: List[str], fields: Optional[List[str]], **header):
+    """``{**header, "birds": [...]}`` streamed from cached species JSON."""
+    opening = b"".join(
+        encode_json(key) + b":" + encode_json(value) + b"," for key, value in header.items()
+    )
+
+    def generate():
+        yield b"{" + opening + b'"birds":['
+        yield from cache.stream(bird_ids, fields)
+        yield b"]}"
+
+    return app.response_class(generate(), mimetype="application/json")
+
+
+def eligible_birds(state: Dict[str, object], area_id: str) -> List[Bird]:
+    """The encounter for an area in the current time slot.
+
+    The draw is seeded from the slot's encounter seed, so it is the same on
+    every call (and every worker) until the clock advances or resets.
+    """
     time_slot = TIME_SLOTS[state["time_index"]]
     weather = state["area_weather"].get(area_id, "Clear")
-    birds = [
-        bird
-        for bird in BIRDS
-        if time_slot in bird.active_times
-        and weather in bird.weather
-        and any(habitat in bird.habitats for habitat in area["habitats"])
-    ]
-    random.shuffle(birds)
-    return birds[:5]
+    rng = random.Random(f"{state.get('encounter_seed', 0)}:{area_id}")
+    with metrics.span("eligible_birds"):
+        return current_catalog().spawn_index.sample(rng, area_id, time_slot, weather, 5)
+
+
+def advance_clock(state: Dict[str, object], rng=random) -> None:
+    state["time_index"] = (state["time_index"] + 1) % len(TIME_SLOTS)
+    state["area_weather"] = roll_weather(rng)
+    state["encounter_seed"] = rng.getrandbits(32)
+    state["net_attempts"] = 0
+
+
+def release_bird(
+    state: Dict[str, object], bird_id: Optional[str] = None, entry_id: Optional[int] = None
+) -> Optional[Tuple[int, str]]:
+    """Release a box entry, by entry id or else the oldest of ``bird_id``.
+
+    Returns the released (entry id, bird id), or None if it is not boxed.
+    The bird's level is dropped once no copy is left in team or box.
+    """
+    with metrics.span("release"):
+        box = state["box"]
+        if isinstance(entry_id, int):
+            bird_id = box.remove_entry(entry_id)
+        else:
+            entry_id = box.remove(bird_id)
+        if bird_id is None or entry_id is None:
+            return None
+        state["changes"].record("box_remove", entry_id, bird_id)
+        record_progress({"op": "release", "bird": bird_id, "entry": entry_id})
+        if bird_id not in state["team"] and bird_id not in box:
+            if bird_id in state["levels"]:
+                set_level(state, bird_id, None)
+        record_scores(state)
+    return entry_id, bird_id
+
+
+def pick_opponent(
+    level: int, area_id: Optional[str], time_slot: str, weather: str, rng=random
+) -> Optional[Tuple[Bird, int]]:
+    matchmaker = current_catalog().matchmaker
+    # Fall back to the whole catalog when nothing spawns in the area right now.
+    return matchmaker.pick(rng, level, area_id, time_slot, weather) or matchmaker.pick(
+        rng, level, None, time_slot, weather
+    )
+
+
+def award_level(state: Dict[str, object], bird_id: str) -> int:
+    with metrics.span("level_up"):
+        set_level(state, bird_id, state["levels"].get(bird_id, 1) + 1)
+        record_progress(
+            {"op": "level", "bird": bird_id, "level": state["levels"][bird_id]}
+        )
+        record_scores(state)
+    return state["levels"][bird_id]
 
 
 @app.get("/api/state")
 def get_state():
-    return jsonify(build_state_payload())
+    with player_session(write=False) as state:
+        return jsonify(build_state_payload(state))
 
 
 @app.post("/api/advance-time")
 def advance_time():
-    state["time_index"] = (state["time_index"] + 1) % len(TIME_SLOTS)
-    state["area_weather"] = roll_weather()
-    state["net_attempts"] = 0
-    return jsonify(build_state_payload())
+    with player_session() as state:
+        advance_clock(state)
+        encounters.invalidate(g.session_id)
+        payload = build_state_payload(state)
+    event_hub.publish(g.session_id, "clock", payload)
+    return jsonify(payload)
 
 
 @app.post("/api/reset")
 def reset():
-    reset_state()
-    return jsonify(build_state_payload())
+    with player_session() as state:
+        reset_state(state)
+        encounters.invalidate(g.session_id)
+        record_progress({"op": "reset"})
+        record_scores(state)
+        payload = build_state_payload(state)
+    event_hub.publish(g.session_id, "clock", payload)
+    return jsonify(payload)
+
+
+def event_streams_supported() -> bool:
+    """Whether this server can hold idle event streams without a worker each.
+
+    A stream waits for frames between heartbeats. Under gevent workers
+    (``gunicorn -k gevent``) that wait parks a greenlet, and the threaded
+    development server starts a thread per connection; a sync worker would
+    be tied up for as long as the stream is open.
+    """
+    monkey = sys.modules.get("gevent.monkey")
+    if monkey is not None and monkey.is_module_patched("threading"):
+        return True
+    environ = request.environ
+    return bool(environ.get("wsgi.multithread")) and environ.get(
+        "SERVER_SOFTWARE", ""
+    ).startswith("Werkzeug/")
+
+
+@app.get("/api/events")
+def stream_events():
+    if not event_streams_supported():
+        return jsonify({"error": "event streams need gevent workers"}), 503
+    last_id = request.headers.get("Last-Event-ID", "")
+    stream = event_hub.subscribe(g.session_id, int(last_id) if last_id.isdigit() else 0)
+    if stream is None:
+        return jsonify({"error": "too many event subscribers"}), 503
+    response = Response(stream, mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@app.get("/api/bootstrap")
+def bootstrap():
+    """State, player and catalog in one response for the first paint.
+
+    The catalog is spliced in pre-encoded, and left out (null) when the
+    client's ``catalogEtag`` shows it already holds the current one.
+    """
+    cache = current_catalog().cache
+    etag = cache.etag
+    cached = request.args.get("catalogEtag") == etag
+    with player_session(write=False) as state:
+        state_body = encode_json(build_state_payload(state))
+        player_body = encode_json(player_payload(state))
+    head = b'{"catalog":'
+    catalog = memoryview(b"null") if cached else cache.catalog()
+    tail = b"".join(
+        (
+            b',"catalog_etag":',
+            encode_json(etag),
+            b',"events":',
+            encode_json(event_streams_supported()),
+            b',"player":',
+            player_body,
+            b',"state":',
+            state_body,
+            b"}",
+        )
+    )
+
+    def generate():
+        yield head
+        yield from buffer_chunks(catalog)
+        yield tail
+
+    response = app.response_class(generate(), mimetype="application/json")
+    response.content_length = len(head) + len(catalog) + len(tail)
+    response.headers["Cache-Control"] = "no-store"
+    return response
 
 
 @app.get("/api/birds")
 def list_birds():
-    return jsonify([bird_to_dict(bird) for bird in BIRDS])
+    """The whole catalog, or one page of it when ``cursor``, ``limit`` or
+    ``fields`` is given.
+
+    Pages look like ``{"next_cursor": ..., "birds": [...]}``; ``fields`` is a
+    comma-separated list of species keys to keep. A page is streamed from the
+    cached species JSON a chunk at a time rather than built up front.
+    """
+    args = request.args
+    cache = current_catalog().cache
+    if not any(name in args for name in ("cursor", "limit", "fields")):
+        return json_bytes(cache.catalog(), cache.etag)
+    cursor = args.get("cursor", default=0, type=int)
+    limit = args.get("limit", default=CATALOG_PAGE_SIZE, type=int)
+    if cursor < 0 or not 1 <= limit <= MAX_CATALOG_PAGE_SIZE:
+        return jsonify({"error": f"limit must be 1-{MAX_CATALOG_PAGE_SIZE}"}), 400
+    fields = projected_fields()
+    if fields == []:
+        return jsonify({"error": f"fields must be among {', '.join(BIRD_FIELDS)}"}), 400
+    bird_ids, next_cursor = cache.page(cursor, limit)
+    return stream_species(cache, bird_ids, fields, next_cursor=next_cursor)
+
+
+@app.get("/api/birds/search")
+def search_birds():
+    """Species matching every given filter, a page at a time.
+
+    Filters are ``category``, ``size``, ``rarity``, ``temperament``,
+    ``traits``, ``habitats``, ``active_times`` and ``weather``, each a
+    comma-separated list of accepted values, plus ``min`` / ``max`` stat
+    bounds such as ``min=Speed:100`` (repeatable). ``sort`` orders by a stat,
+    descending with a leading ``-``; ``cursor`` is an offset into the
+    results and ``fields`` projects as in ``/api/birds``.
+    """
+    args = request.args
+    cursor = args.get("cursor", default=0, type=int)
+    limit = args.get("limit", default=CATALOG_PAGE_SIZE, type=int)
+    if cursor < 0 or not 1 <= limit <= MAX_CATALOG_PAGE_SIZE:
+        return jsonify({"error": f"limit must be 1-{MAX_CATALOG_PAGE_SIZE}"}), 400
+    fields = projected_fields()
+    if fields == []:
+        return jsonify({"error": f"fields must be among {', '.join(BIRD_FIELDS)}"}), 400
+    terms = {}
+    for field in SEARCH_FIELDS:
+        values = [v for arg in args.getlist(field) for v in arg.split(",") if v]
+        if values:
+            terms[field] = values
+    stats = []
+    for bound in ("min", "max"):
+        for arg in args.getlist(bound):
+            name, _, value = arg.rpartition(":")
+            if name not in STAT_NAMES or not value.lstrip("-").isdigit():
+                return jsonify({"error": f"{bound} must look like Speed:100"}), 400
+            value = int(value)
+            stats.append((name, value, None) if bound == "min" else (name, None, value))
+    sort = args.get("sort") or None
+    descending = bool(sort) and sort.startswith("-")
+    if sort and sort.lstrip("-") not in STAT_NAMES:
+        return jsonify({"error": f"sort must be a stat: {', '.join(STAT_NAMES)}"}), 400
+    catalog = current_catalog()
+    with metrics.span("search"):
+        index = catalog.search
+        docs = index.search(terms, stats, sort and sort.lstrip("-"), descending)
+    page = docs[cursor : cursor + limit]
+    next_cursor = cursor + limit if cursor + limit < len(docs) else None
+    return stream_species(
+        catalog.cache,
+        [index.ids[doc] for doc in page],
+        fields,
+        next_cursor=next_cursor,
+        total=len(docs),
+    )
+
+
+@app.get("/api/birds/<bird_id>")
+def get_bird(bird_id: str):
+    cache = current_catalog().cache
+    try:
+        body = cache.species(bird_id)
+    except KeyError:
+        return jsonify({"error": "bird not found"}), 404
+    return json_bytes(body, cache.species_etag(bird_id))
 
 
 @app.get("/api/player")
 def player_state():
-    return jsonify(
-        {
-            "team": state["team"],
-            "box": state["box"],
-            "dex": list(state["dex"]),
-            "levels": state["levels"],
-        }
-    )
+    cursor = request.args.get("cursor", default=0, type=int)
+    limit = request.args.get("limit", default=BOX_PAGE_SIZE, type=int)
+    since = request.args.get("since", type=int)
+    if cursor < 0 or not 1 <= limit <= MAX_BOX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be 1-{MAX_BOX_PAGE_SIZE}"}), 400
+    with player_session(write=False) as state:
+        return jsonify(player_sync_payload(state, since, cursor, limit))
+
+
+@app.get("/api/player/progress")
+def player_progress():
+    """Dex completion per area, habitat, rarity and category."""
+    catalog = current_catalog()
+    with player_session(write=False) as state:
+        counts = collection_progress(state)
+        return jsonify(
+            {
+                "dex": len(state["dex"]),
+                "total": len(catalog.birds),
+                "catalog_etag": catalog.etag,
+                "groups": catalog.progress.report(counts),
+            }
+        )
 
 
 @app.get("/api/expedition")
@@ -697,102 +747,272 @@ def expedition():
     area_id = request.args.get("area")
     if not area_id:
         return jsonify({"error": "area is required"}), 400
-    area = next((area for area in AREAS if area["id"] == area_id), None)
+    area = current_catalog().area(area_id)
     if not area:
         return jsonify({"error": "area not found"}), 404
-    birds = eligible_birds(area_id)
-    return jsonify(
-        {
-            "area": area,
-            "weather": state["area_weather"].get(area_id, "Clear"),
-            "time_slot": TIME_SLOTS[state["time_index"]],
-            "birds": [bird_to_dict(bird) for bird in birds],
-        }
-    )
+    with player_session(write=False) as state:
+        weather = state["area_weather"].get(area_id, "Clear")
+        key = (
+            state["time_index"],
+            weather,
+            state.get("encounter_seed", 0),
+            current_catalog().etag,
+        )
+        cached = encounters.get(g.session_id, area_id, key)
+        if cached is None:
+            metrics.inc("birdmon_encounters_total", result="miss")
+            body = render_species(
+                {
+                    "area": area,
+                    "weather": weather,
+                    "time_slot": TIME_SLOTS[state["time_index"]],
+                },
+                birds=eligible_birds(state, area_id),
+            )
+            cached = (body, strong_etag(body))
+            encounters.put(g.session_id, area_id, key, *cached)
+        else:
+            metrics.inc("birdmon_encounters_total", result="hit")
+    return json_bytes(*cached)
+
+
+def throw_net(state: Dict[str, object], bird: Bird, rng=random) -> Dict[str, object]:
+    with metrics.span("capture"):
+        state["net_attempts"] = int(state.get("net_attempts", 0)) + 1
+        state["nets_thrown"] = state.get("nets_thrown", 0) + 1
+        roll = rng.randint(1, 100)
+        success = roll <= bird.catch_rate
+        if success:
+            state["captures"] = state.get("captures", 0) + 1
+            changes = state["changes"]
+            if bird.id not in state["dex"]:
+                add_to_dex(state, bird)
+            if bird.id not in state["levels"]:
+                set_level(state, bird.id, 1)
+            if len(state["team"]) < 3:
+                state["team"].append(bird.id)
+                changes.record("team")
+                location = "team"
+            else:
+                changes.record("box_add", state["box"].add(bird.id), bird.id)
+                location = "box"
+            record_progress({"op": "capture", "bird": bird.id, "to": location})
+        else:
+            location = "escaped"
+            # Only the leaderboard counters change, so nobody is notified.
+            record_progress({"op": "miss", "bird": bird.id}, notify=False)
+    metrics.inc("birdmon_captures_total", result="caught" if success else "escaped")
+    return {"success": success, "location": location, "roll": roll}
 
 
 @app.post("/api/capture")
 def capture():
-    payload = request.get_json(silent=True) or {}
+    payload = read_payload()
     bird_id = payload.get("birdId")
-    bird = next((bird for bird in BIRDS if bird.id == bird_id), None)
+    bird = current_catalog().species(bird_id)
     if not bird:
         return jsonify({"error": "bird not found"}), 404
-    state["net_attempts"] = int(state.get("net_attempts", 0)) + 1
-    roll = random.randint(1, 100)
-    success = roll <= bird.catch_rate
-    if success:
-        if bird_id not in state["dex"]:
-            state["dex"].add(bird_id)
-        state["levels"].setdefault(bird_id, 1)
-        if len(state["team"]) < 3:
-            state["team"].append(bird_id)
-            location = "team"
-        else:
-            state["box"].append(bird_id)
-            location = "box"
-    else:
-        location = "escaped"
-    return jsonify(
-        {
-            "success": success,
-            "location": location,
-            "roll": roll,
-            "net_attempts": state["net_attempts"],
-        }
-    )
+    with player_session() as state:
+        result = throw_net(state, bird)
+        record_scores(state)
+        return jsonify({**result, "net_attempts": state["net_attempts"]})
+
+
+@app.post("/api/capture/batch")
+def capture_batch():
+    payload = read_payload()
+    bird_ids = payload.get("birdIds")
+    until_caught = bool(payload.get("untilCaught"))
+    if until_caught:
+        max_nets = payload.get("maxNets", MAX_BATCH_THROWS)
+        if not isinstance(max_nets, int) or not 1 <= max_nets <= MAX_BATCH_THROWS:
+            return jsonify({"error": f"maxNets must be 1-{MAX_BATCH_THROWS}"}), 400
+        bird_ids = [payload.get("birdId")] * max_nets
+    if (
+        not isinstance(bird_ids, list)
+        or not bird_ids
+        or not all(isinstance(bird_id, str) for bird_id in bird_ids)
+    ):
+        return jsonify({"error": "birdIds or birdId with untilCaught is required"}), 400
+    if len(bird_ids) > MAX_BATCH_THROWS:
+        return jsonify({"error": f"at most {MAX_BATCH_THROWS} throws per batch"}), 400
+    wanted = set(bird_ids)
+    catalog = current_catalog()
+    birds = {bird_id: catalog.species(bird_id) for bird_id in wanted}
+    missing = [bird_id for bird_id, bird in birds.items() if bird is None]
+    if missing:
+        return jsonify({"error": "bird not found", "birdIds": missing}), 404
+    with player_session() as state:
+        results = []
+        for bird_id in bird_ids:
+            result = throw_net(state, birds[bird_id])
+            results.append({"birdId": bird_id, **result})
+            if until_caught and result["success"]:
+                break
+        record_scores(state)
+        return jsonify(
+            {
+                "results": results,
+                "net_attempts": state["net_attempts"],
+                "player": player_payload(state),
+            }
+        )
 
 
 @app.post("/api/release")
 def release():
-    payload = request.get_json(silent=True) or {}
+    payload = read_payload()
     bird_id = payload.get("birdId")
-    if not bird_id:
-        return jsonify({"error": "birdId is required"}), 400
-    if bird_id in state["box"]:
-        state["box"].remove(bird_id)
-    else:
-        return jsonify({"error": "bird not in box"}), 404
-    if bird_id not in state["team"] and bird_id not in state["box"]:
-        state["levels"].pop(bird_id, None)
-    return jsonify(
-        {
-            "team": state["team"],
-            "box": state["box"],
-            "dex": list(state["dex"]),
-            "levels": state["levels"],
-        }
-    )
+    entry_id = payload.get("entryId")
+    since = payload.get("since")
+    if not (bird_id and isinstance(bird_id, str)) and not isinstance(entry_id, int):
+        return jsonify({"error": "birdId or entryId is required"}), 400
+    if since is not None and not isinstance(since, int):
+        return jsonify({"error": "since must be an integer"}), 400
+    with player_session() as state:
+        if release_bird(state, bird_id, entry_id) is None:
+            return jsonify({"error": "bird not in box"}), 404
+        return jsonify(player_sync_payload(state, since))
 
 
 @app.post("/api/battle/start")
 def battle_start():
-    payload = request.get_json(silent=True) or {}
+    payload = read_payload()
     player_bird_id = payload.get("birdId")
-    player_bird = next((bird for bird in BIRDS if bird.id == player_bird_id), None)
+    area_id = payload.get("areaId")
+    catalog = current_catalog()
+    player_bird = catalog.species(player_bird_id)
     if not player_bird:
         return jsonify({"error": "player bird not found"}), 404
-    if player_bird_id not in state["team"]:
-        return jsonify({"error": "bird not in team"}), 400
-    opponent = random.choice(BIRDS)
+    if area_id is not None and not catalog.area(area_id):
+        return jsonify({"error": "area not found"}), 404
+    with player_session(write=False) as state:
+        if player_bird_id not in state["team"]:
+            return jsonify({"error": "bird not in team"}), 400
+        player_level = state["levels"].get(player_bird_id, 1)
+        time_slot = TIME_SLOTS[state["time_index"]]
+        weather = state["area_weather"].get(area_id, "Clear")
+    match = pick_opponent(player_level, area_id, time_slot, weather)
+    if match is None:
+        return jsonify({"error": "no opponents available"}), 503
+    opponent, opponent_level = match
+    player_stats = catalog.level_table.stats(player_bird, player_level)
+    opponent_stats = catalog.level_table.stats(opponent, opponent_level)
+    battle = battles.start(
+        g.session_id, player_bird, opponent, player_stats, opponent_stats
+    )
+    metrics.inc("birdmon_battles_total", event="started")
+    return json_bytes(
+        render_species(
+            {
+                "battle_id": battle.id,
+                "player_level": player_level,
+                "player_stats": player_stats,
+                "opponent_level": opponent_level,
+                "opponent_stats": opponent_stats,
+            },
+            player=player_bird,
+            opponent=opponent,
+        )
+    )
+
+
+@app.post("/api/battle/turn")
+def battle_turn():
+    payload = read_payload()
+    battle_id = payload.get("battleId")
+    if not battle_id or not isinstance(battle_id, str):
+        return jsonify({"error": "battleId is required"}), 400
+    with player_session() as state:
+        battle = battles.get(g.session_id, battle_id)
+        if not battle:
+            return jsonify({"error": "battle not found"}), 404
+        move_index = payload.get("move")
+        if not isinstance(move_index, int) or not 0 <= move_index < len(
+            battle.player.moves
+        ):
+            return jsonify({"error": "invalid move"}), 400
+        log = resolve_turn(battle, move_index, random)
+        result = {**battle.to_dict(), "log": log}
+        if battle.status != "in-progress":
+            battles.finish(battle)
+            metrics.inc("birdmon_battles_total", event=battle.status)
+        if battle.status == "won":
+            result["level"] = award_level(state, battle.player.bird_id)
+        return jsonify(result)
+
+
+@app.get("/api/leaderboard")
+def leaderboard():
+    """Top players on a board plus the caller's own rank.
+
+    Players appear under a public id derived from their session; efficiency
+    is captures per net thrown, once they have thrown enough nets.
+    """
+    board = request.args.get("board", "dex")
+    limit = request.args.get("limit", default=LEADERBOARD_SIZE, type=int)
+    offset = request.args.get("offset", default=0, type=int)
+    if board not in BOARDS:
+        return jsonify({"error": f"board must be one of {', '.join(BOARDS)}"}), 400
+    if offset < 0 or not 1 <= limit <= MAX_LEADERBOARD_SIZE:
+        return jsonify({"error": f"limit must be 1-{MAX_LEADERBOARD_SIZE}"}), 400
+    if STATE_BACKEND == "sqlite":
+        sync_leaderboards()
+    scale = EFFICIENCY_SCALE if board == "efficiency" else 1
+    entries = [
+        {"rank": rank, "player": player, "score": score / scale if scale > 1 else score}
+        for rank, player, score in leaderboards.top(board, limit, offset)
+    ]
+    own = leaderboards.rank(board, g.session_id)
     return jsonify(
         {
-            "player": bird_to_dict(player_bird),
-            "opponent": bird_to_dict(opponent),
-            "player_level": state["levels"].get(player_bird_id, 1),
+            "board": board,
+            "total": leaderboards.size(board),
+            "entries": entries,
+            "you": (
+                {
+                    "rank": own[0],
+                    "player": public_id(g.session_id),
+                    "score": own[1] / scale if scale > 1 else own[1],
+                }
+                if own
+                else None
+            ),
         }
     )
 
 
-@app.post("/api/level-up")
-def level_up():
-    payload = request.get_json(silent=True) or {}
-    bird_id = payload.get("birdId")
-    if not bird_id:
-        return jsonify({"error": "birdId is required"}), 400
-    current_level = state["levels"].get(bird_id, 1)
-    state["levels"][bird_id] = current_level + 1
-    return jsonify({"birdId": bird_id, "level": state["levels"][bird_id]})
+@app.get("/api/analytics/matchups")
+def analytics_matchups():
+    """Win rates for every species pair, simulated in the background.
+
+    Until the result for this catalog is ready the response is 202, with
+    the previous catalog's result (``"stale": true``) when there is one.
+    """
+    trials = request.args.get("trials", default=1000, type=int)
+    if trials not in TRIAL_PRESETS:
+        presets = ", ".join(map(str, TRIAL_PRESETS))
+        return jsonify({"error": f"trials must be one of {presets}"}), 400
+    catalog = current_catalog()
+    result, fresh = matchup_cache.get(catalog.etag, catalog.birds, trials)
+    if fresh:
+        return jsonify(result)
+    response = jsonify({**result, "stale": True} if result else {"status": "pending"})
+    response.status_code = 202
+    response.headers["Retry-After"] = "5"
+    return response
+
+
+@app.get("/api/metrics")
+def metrics_exposition():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.get("/api/metrics/profile")
+def metrics_profile():
+    if not profiler.running:
+        return jsonify({"error": "profiler disabled, set BIRDMON_PROFILE=1"}), 404
+    return Response(profiler.folded(), mimetype="text/plain")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+STAT_NAMES = ("HP", "Attack", "Special Attack", "Defense", "Special Defense", "Speed")
+STAT_INDEX = {name: index for index, name in enumerate(STAT_NAMES)}
+HP, ATTACK, SPECIAL_ATTACK, DEFENSE, SPECIAL_DEFENSE, SPEED = range(len(STAT_NAMES))
+
+
+class Combatant:
+    __slots__ = ("bird_id", "name", "stats", "buffs", "hp", "moves")
+
+    def __init__(self, bird, stats: Optional[Dict[str, int]] = None) -> None:
+        self.bird_id = bird.id
+        self.name = bird.name
+        if stats is None:
+            self.stats = array("h", bird.stat_values)
+        else:
+            self.stats = array("h", (stats.get(name, 0) for name in STAT_NAMES))
+        self.buffs = array("h", bytes(2 * len(STAT_NAMES)))
+        self.hp = self.stats[HP]
+        self.moves = bird.moves
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "bird_id": self.bird_id,
+            "hp": self.hp,
+            "max_hp": self.stats[HP],
+            "buffs": {
+                name: value for name, value in zip(STAT_NAMES, self.buffs) if value
+            },
+        }
+
+
+class Battle:
+    __slots__ = ("id", "session_id", "player", "opponent", "status", "last_seen")
+
+    def __init__(self, session_id: str, player: Combatant, opponent: Combatant) -> None:
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.player = player
+        self.opponent = opponent
+        self.status = "in-progress"
+        self.last_seen = 0.0
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "battle_id": self.id,
+            "status": self.status,
+            "player": self.player.to_dict(),
+            "opponent": self.opponent.to_dict(),
+        }
+
+
+def calculate_damage(
+    move: Dict[str, object], attacker: Combatant, defender: Combatant, rng
+) -> int:
+    if move.get("category") == "special":
+        attack, defense = SPECIAL_ATTACK, SPECIAL_DEFENSE
+    else:
+        attack, defense = ATTACK, DEFENSE
+    attack_stat = attacker.stats[attack] + attacker.buffs[attack]
+    defense_stat = defender.stats[defense] + defender.buffs[defense]
+    base = int(move.get("power") or 0) * 0.6 + attack_stat * 0.3 - defense_stat * 0.25
+    variance = 0.85 + rng.random() * 0.3
+    return max(4, math.floor(base * variance))
+
+
+def apply_move(
+    move: Dict[str, object], attacker: Combatant, defender: Combatant, rng
+) -> Tuple[List[str], int]:
+    logs = [f"{attacker.name} used {move['name']}!"]
+    if move.get("effect") == "heal":
+        amount = int(move.get("amount", 25))
+        attacker.hp = min(attacker.stats[HP], attacker.hp + amount)
+        logs.append(f"{attacker.name} restored {amount} HP!")
+    if move.get("effect") == "buff":
+        stat = str(move.get("stat", "Attack"))
+        amount = int(move.get("amount", 10))
+        if stat in STAT_INDEX:
+            attacker.buffs[STAT_INDEX[stat]] += amount
+        logs.append(f"{attacker.name} boosted {stat} by {amount}!")
+    damage = 0
+    if int(move.get("power") or 0) > 0:
+        damage = calculate_damage(move, attacker, defender, rng)
+        defender.hp = max(0, defender.hp - damage)
+        logs.append(f"{attacker.name} hit for {damage} damage!")
+    return logs, damage
+
+
+def resolve_turn(battle: Battle, move_index: int, rng) -> List[str]:
+    """Play the player's move and, if the opponent is still up, its reply."""
+    logs, _ = apply_move(
+        battle.player.moves[move_index], battle.player, battle.opponent, rng
+    )
+    if battle.opponent.hp == 0:
+        battle.status = "won"
+        return logs
+    reply = rng.choice(battle.opponent.moves)
+    reply_logs, _ = apply_move(reply, battle.opponent, battle.player, rng)
+    logs.extend(reply_logs)
+    if battle.player.hp == 0:
+        battle.status = "lost"
+    return logs
+
+
+class BattleStore:
+    """In-memory battles, one active battle per session, evicted when idle."""
+
+    def __init__(
+        self,
+        idle_seconds: float = 15 * 60,
+        max_battles: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._battles: "OrderedDict[str, Battle]" = OrderedDict()
+        self._by_session: Dict[str, str] = {}
+        self._idle_seconds = idle_seconds
+        self._max_battles = max_battles
+        self._clock = clock
+
+    def __len__(self) -> int:
+        return len(self._battles)
+
+    def start(
+        self,
+        session_id: str,
+        player_bird,
+        opponent_bird,
+        player_stats: Optional[Dict[str, int]] = None,
+        opponent_stats: Optional[Dict[str, int]] = None,
+    ) -> Battle:
+        battle = Battle(
+            session_id,
+            Combatant(player_bird, player_stats),
+            Combatant(opponent_bird, opponent_stats),
+        )
+        with self._lock:
+            previous = self._by_session.pop(session_id, None)
+            if previous:
+                self._battles.pop(previous, None)
+            battle.last_seen = self._clock()
+            self._battles[battle.id] = battle
+            self._by_session[session_id] = battle.id
+            self._evict(battle.last_seen)
+        return battle
+
+    def get(self, session_id: str, battle_id: str) -> Optional[Battle]:
+        with self._lock:
+            battle = self._battles.get(battle_id)
+            if battle is None or battle.session_id != session_id:
+                return None
+            battle.last_seen = self._clock()
+            self._battles.move_to_end(battle_id)
+            return battle
+
+    def finish(self, battle: Battle) -> None:
+        with self._lock:
+            self._battles.pop(battle.id, None)
+            if self._by_session.get(battle.session_id) == battle.id:
+                del self._by_session[battle.session_id]
+
+    def _evict(self, now: float) -> None:
+        battles = self._battles
+        while battles:
+            battle = next(iter(battles.values()))
+            if (
+                now - battle.last_seen <= self._idle_seconds
+                and len(battles) <= self._max_battles
+            ):
+                return
+            del battles[battle.id]
+            if self._by_session.get(battle.session_id) == battle.id:
+                del self._by_session[battle.session_id]
@@ -0,0 +1,79 @@
+"""Catalog cold start cost against catalog size.
+
+For each size this maps the compiled file, builds the catalog generation the
+app builds at startup (and on every reload), reports the Python heap that
+generation keeps, and times a fresh interpreter importing the app against
+that catalog, which is what a new worker pays.
+
+Usage: python benchmarks/bench_catalog_load.py [--sizes 18,1000,10000,50000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from synthetic import make_areas, make_birds
+
+from catalog_registry import CatalogGeneration
+from species_catalog import SpeciesCatalog, compile_catalog
+
+
+BACKEND = str(Path(__file__).resolve().parents[1])
+
+
+def cold_start(path: str) -> float:
+    env = {**os.environ, "BIRDMON_CATALOG": path, "BIRDMON_DATA_DIR": ""}
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app"], cwd=BACKEND, env=env, check=True)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="18,1000,10000,50000")
+    args = parser.parse_args()
+
+    areas = make_areas(4)
+    print(
+        f"{'species':>8} {'file MB':>8} {'map ms':>8} {'build ms':>9}"
+        f" {'heap MB':>8} {'lookup us':>10} {'cold start ms':>14}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [int(value) for value in args.sizes.split(",")]:
+            path = os.path.join(directory, f"catalog-{size}.bin")
+            records = [bird.to_dict() for bird in make_birds(size)]
+            compile_catalog(records, areas, path)
+            probe = records[size // 2]["id"]
+            del records
+
+            start = time.perf_counter()
+            catalog = SpeciesCatalog(path)
+            mapped = time.perf_counter() - start
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            generation = CatalogGeneration(0, catalog)
+            built = time.perf_counter() - start
+            heap = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            generation.species(probe)
+            lookup = time.perf_counter() - start
+            del generation, catalog
+
+            print(
+                f"{size:>8} {os.path.getsize(path) / 1e6:>8.2f} {mapped * 1e3:>8.2f}"
+                f" {built * 1e3:>9.1f} {heap / 1e6:>8.2f} {lookup * 1e6:>10.1f}"
+                f" {cold_start(path) * 1e3:>14.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
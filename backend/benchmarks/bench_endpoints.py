@@ -0,0 +1,302 @@
+"""Endpoint latency benchmark with synthetic catalogs and regression gates.
+
+Every scenario (species count x box size x session count) runs in its own
+process against a compiled synthetic catalog. Each route is driven through
+the Flask test client from a thread pool, and p50/p95/p99 latency plus
+throughput are recorded. Tail latency under concurrency is mostly thread
+switching, so each route is also timed from a single thread in several
+repeats, and the lowest of those p50s is the figure the gate compares:
+other load on the machine only ever adds time, so the best repeat is the
+one that moves least between runs. A fixed pure-Python workload is timed
+after every route, and baselines are scaled by how much faster or slower
+its best time in the scenario was, so a throttled machine does not read as
+a regression. The scenario's fixture sessions are frozen out of the garbage
+collector before anything is timed.
+
+Usage:
+  python benchmarks/bench_endpoints.py --save-baseline
+  python benchmarks/bench_endpoints.py --baseline benchmarks/endpoint_baseline.json
+
+With --baseline the run exits non-zero when a route's gated latency grows by
+more than --threshold (default 1.25x) and by more than --noise-floor (default
+0.5 ms) over the stored value.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_BASELINE = HERE / "endpoint_baseline.json"
+ROUTES = [
+    "state",
+    "expedition",
+    "capture",
+    "release",
+    "battle_start",
+    "battle_turn",
+    "player",
+]
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+CALIBRATION_PAYLOAD = {
+    "birds": [
+        {"id": f"bird-{index}", "stats": list(range(6)), "tags": ["a", "b"]}
+        for index in range(20)
+    ]
+}
+
+
+def calibrate(repeats: int) -> float:
+    """Best time of a fixed encode/decode loop, in milliseconds."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(200):
+            json.loads(json.dumps(CALIBRATION_PAYLOAD))
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1e3
+
+
+def run_scenario(
+    box_size: int, session_count: int, requests: int, concurrency: int, repeats: int
+):
+    sys.path.insert(0, str(HERE.parent))
+    import app as birdmon
+
+    rng = random.Random(3)
+    bird_ids = [bird.id for bird in birdmon.catalogs.current.birds]
+    area_ids = [area["id"] for area in birdmon.catalogs.current.areas]
+    session_ids = [f"bench-session-{index:06d}" for index in range(session_count)]
+    boxed: Dict[str, List[str]] = {}
+    teams: Dict[str, List[str]] = {}
+    for session_id in session_ids:
+        with birdmon.sessions.session(session_id) as state:
+            team = rng.sample(bird_ids, min(3, len(bird_ids)))
+            state["team"].extend(team)
+            for bird_id in team:
+                state["dex"].add(bird_id)
+                state["levels"][bird_id] = 1
+            box = [rng.choice(bird_ids) for _ in range(box_size)]
+            for bird_id in box:
+                state["box"].add(bird_id)
+                state["dex"].add(bird_id)
+                state["levels"].setdefault(bird_id, 1)
+        teams[session_id] = team
+        boxed[session_id] = box
+
+    # The fixture sessions live for the whole run; move them out of the
+    # collector's reach so full collections over them don't land in
+    # whichever request happens to trigger one.
+    gc.collect()
+    gc.freeze()
+
+    active_battles: Dict[str, str] = {}
+
+    def call(route: str, client, session_id: str):
+        headers = {birdmon.SESSION_HEADER: session_id}
+        if route == "state":
+            return client.get("/api/state", headers=headers)
+        if route == "expedition":
+            area_id = rng.choice(area_ids)
+            return client.get(f"/api/expedition?area={area_id}", headers=headers)
+        if route == "capture":
+            body = {"birdId": rng.choice(bird_ids)}
+            return client.post("/api/capture", json=body, headers=headers)
+        if route == "release":
+            box = boxed[session_id]
+            body = {"birdId": box.pop() if box else rng.choice(bird_ids)}
+            return client.post("/api/release", json=body, headers=headers)
+        if route == "battle_start":
+            body = {"birdId": rng.choice(teams[session_id])}
+            return client.post("/api/battle/start", json=body, headers=headers)
+        if route == "battle_turn":
+            # Battles are started as needed and played until they end.
+            battle_id = active_battles.get(session_id)
+            if battle_id is None:
+                body = {"birdId": rng.choice(teams[session_id])}
+                started = client.post("/api/battle/start", json=body, headers=headers)
+                battle_id = started.get_json()["battle_id"]
+            body = {"battleId": battle_id, "move": 0}
+            response = client.post("/api/battle/turn", json=body, headers=headers)
+            result = response.get_json()
+            if result.get("status") == "in-progress":
+                active_battles[session_id] = battle_id
+            else:
+                active_battles.pop(session_id, None)
+            return response
+        return client.get("/api/player", headers=headers)
+
+    def drive(route: str, concurrency: int) -> List[float]:
+        per_worker = max(1, requests // concurrency)
+
+        def worker(offset: int) -> List[float]:
+            client = birdmon.app.test_client()
+            latencies = []
+            for index in range(per_worker):
+                session_id = session_ids[(offset + index * concurrency) % session_count]
+                start = time.perf_counter()
+                call(route, client, session_id)
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            return [x for chunk in pool.map(worker, range(concurrency)) for x in chunk]
+
+    def measure(route: str) -> Dict[str, float]:
+        start = time.perf_counter()
+        samples = drive(route, concurrency)
+        elapsed = time.perf_counter() - start
+        serial = [percentile(drive(route, 1), 0.50) for _ in range(repeats)]
+        # Sampled after every route so the scenario's best covers the whole
+        # run; one background checkpoint should not skew a single route.
+        calibrations.append(calibrate(repeats))
+        return {
+            "p50_ms": percentile(samples, 0.50) * 1e3,
+            "p95_ms": percentile(samples, 0.95) * 1e3,
+            "p99_ms": percentile(samples, 0.99) * 1e3,
+            "rps": len(samples) / elapsed,
+            "serial_p50_ms": min(serial) * 1e3,
+        }
+
+    calibrations: List[float] = []
+    results = {route: measure(route) for route in ROUTES}
+    for metrics in results.values():
+        metrics["calibration_ms"] = min(calibrations)
+    return results
+
+
+def spawn_scenario(args, species: int, box_size: int, sessions: int, directory: str):
+    from synthetic import make_areas, make_birds
+
+    from species_catalog import compile_catalog
+
+    env = dict(os.environ, BIRDMON_DATA_DIR="")
+    if species:
+        path = os.path.join(directory, f"catalog-{species}.bin")
+        records = [bird.to_dict() for bird in make_birds(species)]
+        compile_catalog(records, make_areas(4), path)
+        env["BIRDMON_CATALOG"] = path
+    command = [
+        sys.executable,
+        __file__,
+        "--worker",
+        f"--box={box_size}",
+        f"--sessions={sessions}",
+        f"--requests={args.requests}",
+        f"--concurrency={args.concurrency}",
+        f"--repeats={args.repeats}",
+    ]
+    output = subprocess.run(
+        command, env=env, check=True, capture_output=True, text=True
+    )
+    return json.loads(output.stdout)
+
+
+def _ints(text: str) -> List[int]:
+    return [int(value) for value in text.split(",")]
+
+
+def compare(
+    results: Dict, baseline: Dict, threshold: float, noise_floor: float
+) -> List[str]:
+    failures = []
+    for scenario, routes in results.items():
+        for route, metrics in routes.items():
+            reference = baseline.get(scenario, {}).get(route)
+            if reference is None or "serial_p50_ms" not in reference:
+                continue
+            # Scale the baseline to how fast this machine is running now.
+            scale = metrics["calibration_ms"] / reference["calibration_ms"]
+            expected = reference["serial_p50_ms"] * scale
+            measured = metrics["serial_p50_ms"]
+            if measured > expected * threshold and measured - expected > noise_floor:
+                failures.append(
+                    f"{scenario} {route}: p50 {measured:.2f} ms"
+                    f" vs baseline {expected:.2f} ms (scaled x{scale:.2f})"
+                )
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--species", default="0,5000", help="0 uses the real catalog")
+    parser.add_argument("--box", default="0,5000")
+    parser.add_argument("--sessions", default="100")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, type=Path)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--noise-floor", type=float, default=0.5, help="ms")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(
+            run_scenario(
+                int(args.box),
+                int(args.sessions),
+                args.requests,
+                args.concurrency,
+                args.repeats,
+            ),
+            sys.stdout,
+        )
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for species in _ints(args.species):
+            for box_size in _ints(args.box):
+                for sessions in _ints(args.sessions):
+                    scenario = f"species={species or 'real'},box={box_size},sessions={sessions}"
+                    print(scenario)
+                    routes = spawn_scenario(
+                        args, species, box_size, sessions, directory
+                    )
+                    for route, metrics in routes.items():
+                        print(
+                            f"  {route:<13} p50 {metrics['p50_ms']:7.2f}"
+                            f"  p95 {metrics['p95_ms']:7.2f}  p99 {metrics['p99_ms']:7.2f}"
+                            f"  ms  {metrics['rps']:8.0f} req/s"
+                            f"  serial p50 {metrics['serial_p50_ms']:6.2f} ms"
+                            f"  calibration {metrics['calibration_ms']:6.2f} ms"
+                        )
+                    results[scenario] = routes
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"baseline written to {args.save_baseline}")
+    if args.baseline:
+        failures = compare(
+            results,
+            json.loads(args.baseline.read_text()),
+            args.threshold,
+            args.noise_floor,
+        )
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
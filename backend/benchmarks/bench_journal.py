@@ -0,0 +1,72 @@
+"""Journal write throughput, record stalls during checkpoints and restart time.
+
+Usage: python benchmarks/bench_journal.py [--events 1000000] [--players 10000]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from journal import Journal  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--players", type=int, default=10_000)
+    parser.add_argument("--species", type=int, default=200)
+    parser.add_argument("--snapshot-every", type=int, default=200_000)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    directory = tempfile.mkdtemp(prefix="birdmon-journal-")
+    try:
+        journal = Journal(directory, snapshot_every=args.snapshot_every)
+        boxes = {}
+        slowest = 0.0
+        start = time.perf_counter()
+        for index in range(args.events):
+            session_id = f"player-{rng.randrange(args.players)}"
+            box = boxes.setdefault(session_id, [])
+            if box and rng.random() < 0.2:
+                bird_id = box.pop(rng.randrange(len(box)))
+                event = {"op": "release", "bird": bird_id}
+            elif box and rng.random() < 0.1:
+                event = {"op": "level", "bird": box[-1], "level": rng.randint(2, 50)}
+            else:
+                bird_id = f"species-{rng.randrange(args.species)}"
+                box.append(bird_id)
+                event = {"op": "capture", "bird": bird_id, "to": "box"}
+            before = time.perf_counter()
+            journal.record(session_id, event)
+            slowest = max(slowest, time.perf_counter() - before)
+        recorded = time.perf_counter() - start
+        journal.close()
+        durable = time.perf_counter() - start
+
+        start = time.perf_counter()
+        recovered = Journal(directory, snapshot_every=args.snapshot_every)
+        restart = time.perf_counter() - start
+        assert recovered.seq == args.events
+        recovered.close()
+        size = sum(path.stat().st_size for path in Path(directory).iterdir())
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"events            {args.events}")
+    print(f"record            {args.events / recorded:,.0f} events/s")
+    print(f"durable           {args.events / durable:,.0f} events/s")
+    print(f"slowest record    {slowest * 1e3:,.1f} ms")
+    print(f"restart           {restart * 1e3:,.0f} ms")
+    print(f"on disk           {size / 1e6:,.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Leaderboard update and query cost at scale.
+
+Fills every board for ``--players`` players, then applies score changes the
+way gameplay does (small bumps, the odd reset) and times top-k and rank
+queries against re-sorting every score per query.
+
+Usage: python benchmarks/bench_leaderboard.py [--players 1000000] [--updates 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from leaderboard import BOARDS, EFFICIENCY_SCALE, Leaderboards  # noqa: E402
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--updates", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    sessions = [f"bench-player-{index:07d}" for index in range(args.players)]
+    scores = {
+        "dex": [rng.randint(1, 400) for _ in sessions],
+        "level": [rng.randint(1, 100) for _ in sessions],
+        "captures": [rng.randint(1, 5000) for _ in sessions],
+        "efficiency": [rng.randint(0, EFFICIENCY_SCALE) for _ in sessions],
+    }
+    boards = Leaderboards()
+    before = rss_mb()
+    start = time.perf_counter()
+    for index, session_id in enumerate(sessions):
+        boards.update(session_id, {board: scores[board][index] for board in BOARDS})
+    fill = time.perf_counter() - start
+    grown = rss_mb() - before
+
+    start = time.perf_counter()
+    for _ in range(args.updates):
+        index = rng.randrange(args.players)
+        if rng.random() < 0.01:
+            changes = {board: None for board in BOARDS}
+        else:
+            changes = {
+                "dex": (scores["dex"][index] or 0) + 1,
+                "captures": (scores["captures"][index] or 0) + rng.randint(1, 3),
+                "efficiency": rng.randint(0, EFFICIENCY_SCALE),
+            }
+        boards.update(sessions[index], changes)
+        for board, score in changes.items():
+            scores[board][index] = score
+    update = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        boards.top(rng.choice(BOARDS), 10, rng.choice((0, 0, 1000, args.players // 2)))
+    top = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        boards.rank(rng.choice(BOARDS), sessions[rng.randrange(args.players)])
+    rank = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = sorted(
+        (score for score in scores["dex"] if score is not None), reverse=True
+    )[:10]
+    rescan = time.perf_counter() - start
+    assert [score for _, _, score in boards.top("dex", 10)] == expected
+
+    print(f"players            {args.players}")
+    print(
+        f"fill               {fill:.1f}s ({fill / args.players * 1e6:.1f} us/player, 4 boards)"
+    )
+    print(f"memory             {grown:.0f} MB")
+    print(f"update             {update / args.updates * 1e6:.1f} us")
+    print(f"top 10             {top / args.queries * 1e6:.1f} us")
+    print(f"rank               {rank / args.queries * 1e6:.1f} us")
+    print(f"re-sort per query  {rescan * 1e3:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
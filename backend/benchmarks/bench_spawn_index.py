@@ -0,0 +1,74 @@
+"""Expedition candidate lookup cost against catalog size.
+
+"index us" is a rarity-weighted draw of five distinct species from the
+per-cell alias tables (built on the first draw from each cell).
+
+Usage: python benchmarks/bench_spawn_index.py [--sizes 18,1000,10000,50000]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from synthetic import make_areas, make_birds
+
+from app import TIME_SLOTS, WEATHER_TYPES
+from spawn_index import SpawnIndex
+from species_catalog import RARITY_WEIGHTS
+
+
+def linear_scan(birds, area: Dict[str, object], time_slot: str, weather: str) -> List:
+    return [
+        bird
+        for bird in birds
+        if time_slot in bird.active_times
+        and weather in bird.weather
+        and any(habitat in bird.habitats for habitat in area["habitats"])
+    ]
+
+
+def per_call_us(fn, queries, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(*query)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="18,1000,10000,50000")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    areas = make_areas(4)
+    print(f"{'species':>8} {'build ms':>9} {'index us':>9} {'scan us':>10}")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        birds = make_birds(size)
+        start = time.perf_counter()
+        index = SpawnIndex(
+            birds, areas, TIME_SLOTS, WEATHER_TYPES, rarity_weights=RARITY_WEIGHTS
+        )
+        build_ms = (time.perf_counter() - start) * 1e3
+        queries = [
+            (rng.choice(areas), rng.choice(TIME_SLOTS), rng.choice(WEATHER_TYPES))
+            for _ in range(args.queries)
+        ]
+        indexed = per_call_us(
+            lambda area, slot, weather: index.sample(rng, area["id"], slot, weather, 5),
+            queries,
+            repeat=50,
+        )
+        scanned = per_call_us(
+            lambda area, slot, weather: linear_scan(birds, area, slot, weather),
+            queries,
+            repeat=max(1, 2000 // size),
+        )
+        print(f"{size:>8} {build_ms:>9.1f} {indexed:>9.2f} {scanned:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
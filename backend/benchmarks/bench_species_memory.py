@@ -0,0 +1,81 @@
+"""Memory cost of the compact species model against the old dataclass.
+
+Both models are built from the same JSON records (the way the catalog
+materializes them, sharing one pool), measured with tracemalloc, and
+checked to serialize identically.
+
+Usage: python benchmarks/bench_species_memory.py [--species 100000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import Dict, List
+
+from synthetic import make_birds
+
+from catalog_cache import encode_json
+from species import Bird, SpeciesPool
+
+
+@dataclass
+class LegacyBird:
+    id: str
+    name: str
+    category: str
+    size: str
+    habitats: List[str]
+    active_times: List[str]
+    weather: List[str]
+    rarity: str
+    temperament: str
+    catch_rate: int
+    traits: List[str]
+    description: str
+    stats: Dict[str, int]
+    moves: List[Dict[str, object]]
+
+
+def build(cls, blobs: List[bytes]):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    birds = [cls(**json.loads(blob)) for blob in blobs]
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return birds, size, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--species", type=int, default=100_000)
+    args = parser.parse_args()
+
+    blobs = [encode_json(bird.to_dict()) for bird in make_birds(args.species)]
+    legacy, legacy_bytes, legacy_build = build(LegacyBird, blobs)
+    compact, compact_bytes, compact_build = build(
+        partial(Bird, pool=SpeciesPool()), blobs
+    )
+
+    assert all(
+        encode_json(asdict(old)) == encode_json(new.to_dict())
+        for old, new in zip(legacy, compact)
+    )
+
+    count = args.species
+    print(f"species           {count}")
+    print(f"{'':<10} {'bytes/species':>14} {'build s':>8}")
+    print(f"{'dataclass':<10} {legacy_bytes / count:>14.0f} {legacy_build:>8.2f}")
+    print(f"{'compact':<10} {compact_bytes / count:>14.0f} {compact_build:>8.2f}")
+    print(f"serialization     identical for all {count} species")
+
+
+if __name__ == "__main__":
+    main()
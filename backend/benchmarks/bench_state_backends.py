@@ -0,0 +1,132 @@
+"""Multi-process throughput of the memory and SQLite state backends.
+
+Every worker is a separate process running the app through the Flask test
+client, the way gunicorn workers would, and drives a capture / release /
+player / advance-time mix over a shared pool of sessions. With the SQLite
+backend all workers see the same state; the run checks that the number of
+birds held at the end matches the captures and releases the workers saw.
+
+Usage: python benchmarks/bench_state_backends.py [--workers 1,2,4] [--requests 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+HERE = Path(__file__).resolve().parent
+
+
+def run_worker(index: int, sessions: int, requests: int) -> Dict[str, float]:
+    sys.path.insert(0, str(HERE.parent))
+    import app as birdmon
+
+    rng = random.Random(index)
+    bird_ids = [bird.id for bird in birdmon.catalogs.current.birds]
+    client = birdmon.app.test_client()
+    caught = released = 0
+    started = time.time()
+    for _ in range(requests):
+        headers = {birdmon.SESSION_HEADER: f"bench-{rng.randrange(sessions):05d}"}
+        roll = rng.random()
+        if roll < 0.4:
+            body = {"birdId": rng.choice(bird_ids)}
+            result = client.post("/api/capture", json=body, headers=headers)
+            caught += result.get_json()["success"]
+        elif roll < 0.55:
+            body = {"birdId": rng.choice(bird_ids)}
+            result = client.post("/api/release", json=body, headers=headers)
+            released += result.status_code == 200
+        elif roll < 0.6:
+            client.post("/api/advance-time", headers=headers)
+        else:
+            client.get("/api/player", headers=headers)
+    return {
+        "requests": requests,
+        "started": started,
+        "finished": time.time(),
+        "caught": caught,
+        "released": released,
+    }
+
+
+def count_held(sessions: int) -> int:
+    sys.path.insert(0, str(HERE.parent))
+    import app as birdmon
+
+    held = 0
+    for index in range(sessions):
+        with birdmon.sessions.session(f"bench-{index:05d}") as state:
+            held += len(state["team"]) + len(state["box"])
+    return held
+
+
+def run(backend: str, workers: int, args, directory: str) -> Dict[str, float]:
+    env = dict(os.environ, BIRDMON_DATA_DIR="", BIRDMON_STATE_BACKEND=backend)
+    env["BIRDMON_STATE_DB"] = os.path.join(directory, f"state-{workers}.sqlite3")
+    command = [sys.executable, __file__, f"--sessions={args.sessions}"]
+    per_worker = args.requests // workers
+    processes = [
+        subprocess.Popen(
+            command + ["--worker", str(index), f"--requests={per_worker}"],
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for index in range(workers)
+    ]
+    results: List[Dict[str, float]] = []
+    for process in processes:
+        output, _ = process.communicate()
+        if process.returncode:
+            raise SystemExit(f"worker failed with exit code {process.returncode}")
+        results.append(json.loads(output))
+    # Measured from the first worker starting requests to the last one
+    # finishing, so interpreter and catalog start-up are not counted.
+    elapsed = max(r["finished"] for r in results) - min(r["started"] for r in results)
+    summary = {"rps": sum(r["requests"] for r in results) / elapsed}
+    if backend == "sqlite":
+        output = subprocess.run(
+            command + ["--count"], env=env, check=True, capture_output=True, text=True
+        )
+        expected = sum(r["caught"] - r["released"] for r in results)
+        summary["consistent"] = int(output.stdout) == expected
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--count", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        json.dump(run_worker(args.worker, args.sessions, args.requests), sys.stdout)
+        return
+    if args.count:
+        print(count_held(args.sessions))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in ("memory", "sqlite"):
+            for workers in [int(value) for value in args.workers.split(",")]:
+                summary = run(backend, workers, args, directory)
+                line = f"{backend:<7} workers={workers:<3} {summary['rps']:8.0f} req/s"
+                if "consistent" in summary:
+                    line += "  consistent" if summary["consistent"] else "  DIVERGED"
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import TIME_SLOTS, WEATHER_TYPES, Bird, catalogs  # noqa: E402
+from species import SpeciesPool  # noqa: E402
+
+
+BIRDS = catalogs.current.birds
+AREAS = catalogs.current.areas
+
+HABITATS = sorted({habitat for area in AREAS for habitat in area["habitats"]})
+RARITIES = ["common", "uncommon", "rare"]
+STAT_NAMES = list(BIRDS[0].stats)
+
+
+def make_birds(count: int, seed: int = 7) -> List[Bird]:
+    rng = random.Random(seed)
+    pool = SpeciesPool()
+    birds: List[Bird] = []
+    for index in range(count):
+        template = BIRDS[index % len(BIRDS)]
+        birds.append(
+            Bird(
+                id=f"{template.id}-{index}",
+                name=f"{template.name} {index}",
+                category=template.category,
+                size=template.size,
+                habitats=rng.sample(HABITATS, rng.randint(1, 2)),
+                active_times=rng.sample(TIME_SLOTS, rng.randint(1, 3)),
+                weather=rng.sample(WEATHER_TYPES, rng.randint(1, 3)),
+                rarity=rng.choice(RARITIES),
+                temperament=template.temperament,
+                catch_rate=rng.randint(10, 90),
+                traits=list(template.traits),
+                description=template.description,
+                stats={name: rng.randint(40, 140) for name in STAT_NAMES},
+                moves=[dict(move) for move in template.moves],
+                pool=pool,
+            )
+        )
+    return birds
+
+
+def make_areas(count: int, seed: int = 7) -> List[Dict[str, object]]:
+    rng = random.Random(seed)
+    areas = [dict(area) for area in AREAS]
+    for index in range(len(areas), count):
+        template = AREAS[index % len(AREAS)]
+        areas.append(
+            {
+                **template,
+                "id": f"{template['id']}-{index}",
+                "name": f"{template['name']} {index}",
+                "habitats": rng.sample(HABITATS, rng.randint(1, 2)),
+            }
+        )
+    return areas[:count]
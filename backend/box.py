@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class Box:
+    """Multiset of boxed birds with per-species counts and entry ids.
+
+    Every boxed bird gets an increasing entry id. Membership, counts and
+    releases are O(1); listing walks entry ids in order from a cursor.
+    Released entries leave tombstones in the order list that are compacted
+    once they outnumber the live entries.
+    """
+
+    __slots__ = ("_entries", "_counts", "_by_species", "_order", "_next_id")
+
+    def __init__(self, bird_ids: Iterable[str] = ()) -> None:
+        self._entries: Dict[int, str] = {}
+        self._counts: Dict[str, int] = {}
+        self._by_species: Dict[str, Deque[int]] = {}
+        self._order: List[int] = []
+        self._next_id = 1
+        for bird_id in bird_ids:
+            self.add(bird_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, bird_id: object) -> bool:
+        return bird_id in self._counts
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries.values())
+
+    @property
+    def next_id(self) -> int:
+        return self._next_id
+
+    def entries(self) -> Iterator[Tuple[int, str]]:
+        """(entry id, bird id) pairs in entry order."""
+        return iter(self._entries.items())
+
+    def count(self, bird_id: str) -> int:
+        return self._counts.get(bird_id, 0)
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._counts)
+
+    def to_dict(self) -> Dict[str, object]:
+        entries = self._entries
+        return {
+            "next_id": self._next_id,
+            "entries": [[i, entries[i]] for i in self._order if i in entries],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "Box":
+        """Rebuild a box keeping its entry ids, unlike ``Box(bird_ids)``."""
+        box = cls()
+        for entry_id, bird_id in data["entries"]:
+            box._next_id = entry_id
+            box.add(bird_id)
+        box._next_id = data["next_id"]
+        return box
+
+    def add(self, bird_id: str) -> int:
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = bird_id
+        self._counts[bird_id] = self._counts.get(bird_id, 0) + 1
+        self._by_species.setdefault(bird_id, deque()).append(entry_id)
+        self._order.append(entry_id)
+        return entry_id
+
+    def remove(self, bird_id: str) -> Optional[int]:
+        """Release the oldest boxed copy of ``bird_id``."""
+        queue = self._by_species.get(bird_id)
+        while queue:
+            entry_id = queue.popleft()
+            if entry_id in self._entries:
+                self._discard(entry_id, bird_id)
+                return entry_id
+        return None
+
+    def remove_entry(self, entry_id: int) -> Optional[str]:
+        bird_id = self._entries.get(entry_id)
+        if bird_id is not None:
+            self._discard(entry_id, bird_id)
+        return bird_id
+
+    def _discard(self, entry_id: int, bird_id: str) -> None:
+        del self._entries[entry_id]
+        remaining = self._counts[bird_id] - 1
+        if remaining:
+            self._counts[bird_id] = remaining
+        else:
+            del self._counts[bird_id]
+            del self._by_species[bird_id]
+        if len(self._order) > 2 * len(self._entries) + 64:
+            self._order = [i for i in self._order if i in self._entries]
+
+    def page(
+        self, cursor: int = 0, limit: int = 100
+    ) -> Tuple[List[Tuple[int, str]], Optional[int]]:
+        entries = self._entries
+        order = self._order
+        page: List[Tuple[int, str]] = []
+        index = bisect_right(order, cursor)
+        while index < len(order) and len(page) < limit:
+            entry_id = order[index]
+            if entry_id in entries:
+                page.append((entry_id, entries[entry_id]))
+            index += 1
+        has_more = any(order[i] in entries for i in range(index, len(order)))
+        return page, page[-1][0] if page and has_more else None
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+def encode_json(payload: object) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+
+
+def strong_etag(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class CatalogCache:
+    """Species JSON served straight from the mapped catalog.
+
+    The compiled catalog holds the species as one JSON array in the API
+    encoding, so the full catalog and every species are slices of the
+    mapped file; responses join or stream those slices, and a worker never
+    keeps a copy of the catalog of its own. A species' rank is its position
+    plus one, and a page cursor is the last rank served.
+    """
+
+    def __init__(self, birds) -> None:
+        self._birds = birds
+        # The file checksum covers every species, so it changes with them.
+        self.etag = birds.checksum.hex()
+
+    def _fragment(self, bird_id: str) -> Optional[memoryview]:
+        position = self._birds.position(bird_id)
+        return None if position is None else self._birds.fragment(position)
+
+    def species(self, bird_id: str) -> bytes:
+        fragment = self._fragment(bird_id)
+        if fragment is None:
+            raise KeyError(bird_id)
+        return bytes(fragment)
+
+    def page(self, cursor: int = 0, limit: int = 100) -> Tuple[List[str], Optional[int]]:
+        """Up to ``limit`` species ids after ``cursor``, in catalog order,
+        and the cursor for the next page (None on the last one)."""
+        ids = self._birds.ids[cursor : cursor + limit]
+        end = cursor + len(ids)
+        return ids, end if ids and end < len(self._birds) else None
+
+    def stream(
+        self, bird_ids: Sequence[str], fields: Optional[Sequence[str]] = None, chunk: int = 100
+    ) -> Iterator[bytes]:
+        """The species as comma-separated JSON, ``chunk`` at a time.
+
+        With ``fields`` each species is cut down to those keys. Unknown ids
+        are skipped.
+        """
+        separator = b""
+        for start in range(0, len(bird_ids), chunk):
+            encoded = [
+                fragment
+                for fragment in map(self._fragment, bird_ids[start : start + chunk])
+                if fragment is not None
+            ]
+            if fields is not None:
+                encoded = [
+                    encode_json({field: record[field] for field in fields})
+                    for record in (json.loads(bytes(fragment)) for fragment in encoded)
+                ]
+            if encoded:
+                yield separator + b",".join(encoded)
+                separator = b","
+
+    def catalog(self) -> memoryview:
+        return self._birds.body
+
+    def species_etag(self, bird_id: str) -> str:
+        return strong_etag(self._fragment(bird_id))
+
+    def render(self, payload: Dict[str, object], **species: Union[object, List[object]]) -> bytes:
+        """Encode ``payload`` with extra keys filled from cached species JSON.
+
+        Each keyword is either a single species or a list of them.
+        """
+        parts = [encode_json(payload)[:-1]]
+        for key, value in species.items():
+            if isinstance(value, list):
+                encoded = b"[" + b",".join(self._fragment(b.id) for b in value) + b"]"
+            else:
+                encoded = bytes(self._fragment(value.id))
+            separator = b"," if len(parts) > 1 or payload else b""
+            parts.append(separator + json.dumps(key).encode() + b":" + encoded)
+        parts.append(b"}")
+        return b"".join(parts)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from catalog_cache import CatalogCache
+from matchmaking import LevelTable, Matchmaker
+from progress import ProgressGroups
+from search_index import SearchIndex
+from spawn_index import SpawnIndex
+from species_catalog import (
+    RARITY_WEIGHTS,
+    TIME_SLOTS,
+    WEATHER_TYPES,
+    Bird,
+    SpeciesCatalog,
+    load_catalog,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogGeneration:
+    """One build of the catalog with the indexes derived from it.
+
+    Species and areas are looked up by id in hash maps; the spawn index,
+    pre-encoded JSON, search index, collection groups, opponent pools and
+    level tables all belong to the generation, so swapping generations
+    swaps every one of them at once. A generation is never modified once
+    built; catalog changes go through a reload.
+    """
+
+    def __init__(self, number: int, birds: SpeciesCatalog) -> None:
+        self.number = number
+        self.birds = birds
+        self.areas: List[Dict[str, object]] = birds.areas
+        self._areas = {area["id"]: area for area in self.areas}
+        # The spawn cells, postings and sorted stat columns are compiled into
+        # the catalog file, so building a generation only wraps views of it.
+        self.spawn_index = SpawnIndex.compiled(
+            birds.ids,
+            birds.rarities(),
+            self.areas,
+            TIME_SLOTS,
+            WEATHER_TYPES,
+            birds.spawn_cells(),
+            resolve=birds.at,
+            rarity_weights=RARITY_WEIGHTS,
+        )
+        self.cache = CatalogCache(birds)
+        self.level_table = LevelTable()
+        self.matchmaker = Matchmaker(self.spawn_index, birds.stat_total)
+        self.search = SearchIndex(**birds.search_columns())
+        self.progress = ProgressGroups(self.search, self.areas)
+
+    @property
+    def etag(self) -> str:
+        return self.cache.etag
+
+    def species(self, bird_id: object) -> Optional[Bird]:
+        return self.birds.get(bird_id) if isinstance(bird_id, str) else None
+
+    def area(self, area_id: object) -> Optional[Dict[str, object]]:
+        return self._areas.get(area_id) if isinstance(area_id, str) else None
+
+
+class CatalogRegistry:
+    """The live catalog generation, replaced whole on reload.
+
+    Readers take ``current`` once (per request) and use that generation
+    throughout, so they never see a mix of old and new data. A reload
+    builds the next generation off to the side and publishes it with a
+    single reference assignment; requests already running finish on the
+    generation they started with. A failed build leaves the live one in
+    place and is kept in ``last_error``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self.last_error: Optional[Exception] = None
+        self.current = CatalogGeneration(0, load_catalog(path))
+
+    def reload(self) -> CatalogGeneration:
+        """Build a new generation from ``path`` and make it live."""
+        with self._reload_lock:
+            try:
+                generation = CatalogGeneration(self.current.number + 1, load_catalog(self.path))
+            except Exception as error:
+                self.last_error = error
+                raise
+            self.last_error = None
+            self.current = generation
+        return generation
+
+    def watch(self, paths: Sequence[str], interval: float = 2.0) -> None:
+        """Reload in the background whenever one of ``paths`` changes."""
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, args=(list(paths), interval), daemon=True
+        )
+        self._watcher.start()
+
+    def _watch(self, paths: List[str], interval: float) -> None:
+        seen = _mtimes(paths)
+        while True:
+            time.sleep(interval)
+            mtimes = _mtimes(paths)
+            if mtimes != seen:
+                self._reload_logged()
+                # Loading may have recompiled one of the watched files.
+                seen = _mtimes(paths)
+
+    def _reload_logged(self) -> None:
+        try:
+            generation = self.reload()
+        except Exception:
+            logger.exception("catalog reload failed; keeping generation %d", self.current.number)
+        else:
+            logger.info("catalog generation %d is live", generation.number)
+
+
+def _mtimes(paths: List[str]) -> List[Optional[int]]:
+    mtimes: List[Optional[int]] = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return mtimes
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+Change = Tuple[str, tuple]
+
+
+class ChangeLog:
+    """Bounded log of player-state changes keyed by a monotonic version.
+
+    Every change bumps the version. ``since`` returns the changes made after
+    a version the client already holds, or None when that version has
+    dropped out of the log (or predates a reset) and a full snapshot is
+    needed instead.
+    """
+
+    __slots__ = ("version", "_floor", "_changes", "_limit")
+
+    def __init__(self, limit: int = 256) -> None:
+        # Versions start from the wall clock in milliseconds, so a version a
+        # client kept from before a restart or session eviction never looks
+        # current to a freshly built log.
+        self.version = self._floor = int(time.time() * 1000)
+        self._changes: Deque[Tuple[int, str, tuple]] = deque()
+        self._limit = limit
+
+    def record(self, kind: str, *args: object) -> None:
+        self.version += 1
+        self._changes.append((self.version, kind, args))
+        if len(self._changes) > self._limit:
+            self._floor = self._changes.popleft()[0]
+
+    def reset(self) -> None:
+        self.version += 1
+        self._floor = self.version
+        self._changes.clear()
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "version": self.version,
+            "floor": self._floor,
+            "changes": [list(change) for change in self._changes],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object], limit: int = 256) -> "ChangeLog":
+        log = cls(limit)
+        log.version = data["version"]
+        log._floor = data["floor"]
+        log._changes.extend(
+            (version, kind, tuple(args)) for version, kind, args in data["changes"]
+        )
+        return log
+
+    def since(self, version: int) -> Optional[List[Change]]:
+        if not self._floor <= version <= self.version:
+            return None
+        changes: List[Change] = []
+        for change_version, kind, args in reversed(self._changes):
+            if change_version <= version:
+                break
+            changes.append((kind, args))
+        changes.reverse()
+        return changes
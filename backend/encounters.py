@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class EncounterCache:
+    """Rendered expedition encounters per session, area and time slot.
+
+    Entries are grouped by session so ``invalidate`` can drop all of a
+    player's encounters at once when the clock advances or resets; sessions
+    are evicted least recently used first. Each entry remembers the key it
+    was rendered for (time slot, weather, seed, catalog version) and is only
+    served while that key still matches, so a worker that missed an
+    invalidation never returns a stale encounter.
+    """
+
+    def __init__(self, max_sessions: int = 50_000) -> None:
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Dict[str, Tuple[Hashable, bytes, str]]]" = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(
+        self, session_id: str, area_id: str, key: Hashable
+    ) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            areas = self._sessions.get(session_id)
+            entry = areas.get(area_id) if areas else None
+            if entry is None or entry[0] != key:
+                return None
+            self._sessions.move_to_end(session_id)
+            return entry[1], entry[2]
+
+    def put(
+        self, session_id: str, area_id: str, key: Hashable, body: bytes, etag: str
+    ) -> None:
+        with self._lock:
+            areas = self._sessions.get(session_id)
+            if areas is None:
+                areas = self._sessions[session_id] = {}
+            else:
+                self._sessions.move_to_end(session_id)
+            areas[area_id] = (key, body, etag)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
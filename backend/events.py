@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Iterator, Optional, Tuple
+
+
+class _Channel:
+    __slots__ = ("condition", "backlog", "next_id", "subscribers")
+
+    def __init__(self, backlog: int) -> None:
+        self.condition = threading.Condition(threading.Lock())
+        self.backlog: Deque[Tuple[int, bytes]] = deque(maxlen=backlog)
+        self.next_id = 1
+        self.subscribers = 0
+
+
+class EventHub:
+    """Fan-out of Server-Sent Events, one channel per player session.
+
+    Publishing encodes the frame once, appends it to the channel's ring
+    buffer and wakes every waiting subscriber with a single notify, so the
+    cost of a publish does not depend on how many streams are open. Idle
+    subscribers sleep on the channel condition and only wake for new frames
+    or a heartbeat. A reconnecting client sends ``Last-Event-ID`` and is
+    replayed whatever is still in the buffer.
+    """
+
+    def __init__(
+        self,
+        backlog: int = 64,
+        heartbeat: float = 15.0,
+        max_channels: int = 10_000,
+        max_subscribers: int = 10_000,
+    ) -> None:
+        self.backlog = backlog
+        self.heartbeat = heartbeat
+        self.max_channels = max_channels
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._channels: OrderedDict[str, _Channel] = OrderedDict()
+        self._subscribers = 0
+
+    def publish(self, channel_id: str, event: str, data: object) -> int:
+        channel = self._channel(channel_id)
+        payload = json.dumps(data, separators=(",", ":"))
+        with channel.condition:
+            event_id = channel.next_id
+            channel.next_id += 1
+            frame = f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+            channel.backlog.append((event_id, frame.encode()))
+            channel.condition.notify_all()
+        return event_id
+
+    def subscribe(self, channel_id: str, last_id: int = 0) -> Optional[Iterator[bytes]]:
+        """Return a frame iterator, or None when the subscriber cap is reached."""
+        if self._subscribers >= self.max_subscribers:
+            return None
+        return self._stream(channel_id, last_id)
+
+    def subscriber_count(self) -> int:
+        return self._subscribers
+
+    def _stream(self, channel_id: str, last_id: int) -> Iterator[bytes]:
+        # Registration happens on first iteration so that a stream which is
+        # closed before it starts never leaks a subscriber slot.
+        with self._lock:
+            self._subscribers += 1
+            channel = self._get_channel(channel_id)
+            channel.subscribers += 1
+        if last_id >= channel.next_id:
+            # The id belongs to a previous server run; replay the buffer.
+            last_id = 0
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                with channel.condition:
+                    frames = [
+                        frame
+                        for event_id, frame in channel.backlog
+                        if event_id > last_id
+                    ]
+                    if not frames:
+                        channel.condition.wait(self.heartbeat)
+                        frames = [
+                            frame
+                            for event_id, frame in channel.backlog
+                            if event_id > last_id
+                        ]
+                    if frames:
+                        last_id = channel.next_id - 1
+                if frames:
+                    yield b"".join(frames)
+                else:
+                    yield b": keepalive\n\n"
+        finally:
+            with self._lock:
+                channel.subscribers -= 1
+                self._subscribers -= 1
+
+    def _channel(self, channel_id: str) -> _Channel:
+        with self._lock:
+            return self._get_channel(channel_id)
+
+    def _get_channel(self, channel_id: str) -> _Channel:
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = self._channels[channel_id] = _Channel(self.backlog)
+            self._trim()
+        else:
+            self._channels.move_to_end(channel_id)
+        return channel
+
+    def _trim(self) -> None:
+        # Forget the least recently used channels nobody is listening to.
+        excess = len(self._channels) - self.max_channels
+        if excess <= 0:
+            return
+        idle = []
+        for channel_id, channel in self._channels.items():
+            if not channel.subscribers:
+                idle.append(channel_id)
+                if len(idle) == excess:
+                    break
+        for channel_id in idle:
+            del self._channels[channel_id]
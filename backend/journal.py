@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from box import Box
+
+
+SNAPSHOT_FILE = "snapshot.sqlite3"
+LOCK_FILE = "journal.lock"
+SEGMENT_PREFIX = "journal-"
+SEGMENT_SUFFIX = ".log"
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS progress ("
+    "session_id TEXT PRIMARY KEY, seq INTEGER NOT NULL, progress TEXT NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS checkpoint ("
+    "id INTEGER PRIMARY KEY CHECK (id = 0), seq INTEGER NOT NULL)",
+)
+SELECT_PROGRESS = "SELECT seq, progress FROM progress WHERE session_id = ?"
+SELECT_SESSIONS = "SELECT session_id FROM progress"
+UPSERT_PROGRESS = (
+    "INSERT INTO progress (session_id, seq, progress) VALUES (?, ?, ?) "
+    "ON CONFLICT (session_id) DO UPDATE SET seq = excluded.seq, "
+    "progress = excluded.progress"
+)
+SELECT_CHECKPOINT = "SELECT seq FROM checkpoint WHERE id = 0"
+UPSERT_CHECKPOINT = (
+    "INSERT INTO checkpoint (id, seq) VALUES (0, ?) "
+    "ON CONFLICT (id) DO UPDATE SET seq = excluded.seq"
+)
+
+# Session id -> the journal lines (newline-terminated) of its events since
+# the last checkpoint. Lines stay encoded, and a session's lines share one
+# buffer: the garbage collector sees one object per player rather than a
+# few per event, so a full collection no longer walks the whole tail.
+Tail = Dict[str, bytearray]
+
+logger = logging.getLogger(__name__)
+
+
+class JournalError(RuntimeError):
+    pass
+
+
+def empty_progress() -> Dict[str, object]:
+    return {
+        "team": [],
+        "box": Box(),
+        "dex": [],
+        "levels": {},
+        "nets_thrown": 0,
+        "captures": 0,
+    }
+
+
+def encode_progress(progress: Dict[str, object]) -> str:
+    # The box keeps its entry ids: later releases name the entry they remove.
+    return json.dumps(
+        {**progress, "box": progress["box"].to_dict()}, separators=(",", ":")
+    )
+
+
+def decode_progress(text: str) -> Dict[str, object]:
+    progress = {**empty_progress(), **json.loads(text)}
+    box = progress["box"]
+    # Rows folded before entry ids were kept hold a plain list of bird ids.
+    progress["box"] = Box.from_dict(box) if isinstance(box, dict) else Box(box)
+    return progress
+
+
+def apply_event(progress: Dict[str, object], event: Dict[str, object]) -> None:
+    op = event["op"]
+    if op == "reset":
+        progress.update(empty_progress())
+        return
+    bird_id = event["bird"]
+    if op == "capture":
+        progress["nets_thrown"] += 1
+        progress["captures"] += 1
+        if bird_id not in progress["dex"]:
+            progress["dex"].append(bird_id)
+        progress["levels"].setdefault(bird_id, 1)
+        if event["to"] == "box":
+            progress["box"].add(bird_id)
+        else:
+            progress["team"].append(bird_id)
+    elif op == "miss":
+        progress["nets_thrown"] += 1
+    elif op == "release":
+        if "entry" in event:
+            progress["box"].remove_entry(event["entry"])
+        else:
+            progress["box"].remove(bird_id)
+        if bird_id not in progress["team"] and bird_id not in progress["box"]:
+            progress["levels"].pop(bird_id, None)
+    elif op == "level":
+        progress["levels"][bird_id] = event["level"]
+
+
+class Journal:
+    """Append-only journal of player progress over a checkpointed snapshot.
+
+    ``record`` queues an event and files it under its session in the
+    in-memory tail; a writer thread appends queued events to the current
+    segment and fsyncs once per batch (group commit), so requests never
+    wait on the disk. Every ``snapshot_every`` events the tail is handed to
+    a checkpoint thread that folds it into the players' rows of a SQLite
+    snapshot and then deletes the segments it covers.
+
+    Only the tail is kept in memory: ``load`` reads a player's row and
+    replays their tail events on top, and a restart replays at most the
+    segments written since the last checkpoint.
+
+    A journal directory belongs to one process: opening it takes an
+    exclusive lock on it, and a forked child may not record to its
+    parent's journal.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        snapshot_every: int = 200_000,
+        commit_interval: float = 0.005,
+    ) -> None:
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.commit_interval = commit_interval
+        self._path = os.path.join(directory, SNAPSHOT_FILE)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._committed = threading.Condition(threading.Lock())
+        self._wakeup = threading.Event()
+        self._tail: Tail = {}
+        self._folding: Tail = {}
+        self._checkpoint: Optional[threading.Thread] = None
+        self._pending: List[bytes] = []
+        self._seq = 0
+        self._durable_seq = 0
+        self._since_snapshot = 0
+        self._snapshot_requested = False
+        self._segment = None
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+        self._pid = os.getpid()
+        self._lock_file = open(os.path.join(directory, LOCK_FILE), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise JournalError(f"{directory} is in use by another process") from None
+        self._recover()
+        self._open_segment(self._seq + 1)
+        self._writer = threading.Thread(
+            target=self._run, name="journal-writer", daemon=True
+        )
+        self._writer.start()
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def load(self, session_id: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            folding = self._folding.get(session_id, b"")
+            events = bytes(folding) + self._tail.get(session_id, b"")
+        # Read the row only after copying the events: a checkpoint commits
+        # its rows before it lets go of the events it folded, and the row's
+        # seq tells which of them it already holds.
+        row = self._connection().execute(SELECT_PROGRESS, (session_id,)).fetchone()
+        if row is None and not events:
+            return None
+        seq, progress = (
+            (row[0], decode_progress(row[1])) if row else (0, empty_progress())
+        )
+        for event_seq, event in _events(events):
+            if event_seq > seq:
+                apply_event(progress, event)
+        return progress
+
+    def session_ids(self) -> List[str]:
+        """Every session with journaled progress."""
+        with self._lock:
+            pending = set(self._folding) | set(self._tail)
+        rows = self._connection().execute(SELECT_SESSIONS)
+        return sorted(pending.union(session_id for (session_id,) in rows))
+
+    def record(self, session_id: str, event: Dict[str, object]) -> int:
+        if os.getpid() != self._pid:
+            # The writer thread and the directory lock stayed with the parent.
+            raise JournalError("a journal cannot be used from a forked process")
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            line = (
+                json.dumps([seq, session_id, event], separators=(",", ":")) + "\n"
+            ).encode()
+            self._file(session_id, line, event["op"] == "reset")
+            self._pending.append(line)
+            self._since_snapshot += 1
+            if self._since_snapshot >= self.snapshot_every:
+                self._snapshot_requested = True
+        self._wakeup.set()
+        return seq
+
+    def flush(self, seq: Optional[int] = None) -> None:
+        target = self._seq if seq is None else seq
+        self._wakeup.set()
+        with self._committed:
+            self._committed.wait_for(lambda: self._durable_seq >= target)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join()
+        checkpoint = self._checkpoint
+        if checkpoint is not None:
+            checkpoint.join()
+        self._segment.close()
+        self._lock_file.close()
+
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.connection = sqlite3.connect(
+                self._path, isolation_level=None, check_same_thread=False
+            )
+            local.pid = os.getpid()
+        return local.connection
+
+    def _file(self, session_id: str, line: bytes, reset: bool) -> None:
+        if reset:
+            # Nothing before a reset matters to the player's progress.
+            self._tail[session_id] = bytearray(line)
+        else:
+            self._tail.setdefault(session_id, bytearray()).extend(line)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.commit_interval)
+            self._wakeup.clear()
+            self._commit()
+
+    def _commit(self) -> None:
+        checkpoint = None
+        with self._lock:
+            batch, self._pending = self._pending, []
+            seq = self._seq
+            if self._snapshot_requested and self._checkpoint is None:
+                self._snapshot_requested = False
+                self._since_snapshot = 0
+                self._folding, self._tail = self._tail, {}
+                checkpoint = self._checkpoint = threading.Thread(
+                    target=self._fold,
+                    args=(self._folding, seq),
+                    name="journal-checkpoint",
+                    daemon=True,
+                )
+        if batch:
+            self._segment.write(b"".join(batch))
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+        if checkpoint is not None:
+            # Later events go to a new segment; the checkpoint deletes the
+            # ones it folded once its rows are committed.
+            self._segment.close()
+            self._open_segment(seq + 1)
+            checkpoint.start()
+        with self._committed:
+            self._durable_seq = seq
+            self._committed.notify_all()
+
+    def _fold(self, folding: Tail, seq: int) -> None:
+        connection = sqlite3.connect(self._path, isolation_level=None)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for session_id, events in folding.items():
+                row = connection.execute(SELECT_PROGRESS, (session_id,)).fetchone()
+                progress = decode_progress(row[1]) if row else empty_progress()
+                for event_seq, event in _events(events):
+                    apply_event(progress, event)
+                connection.execute(
+                    UPSERT_PROGRESS,
+                    (session_id, event_seq, encode_progress(progress)),
+                )
+            connection.execute(UPSERT_CHECKPOINT, (seq,))
+            connection.execute("COMMIT")
+            # Fold the write-ahead log back into the snapshot and trim it.
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except Exception:
+            logger.exception("journal checkpoint at seq %d failed", seq)
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            with self._lock:
+                # Keep the events in memory (and their segments on disk) and
+                # try again at the next checkpoint.
+                for session_id, events in folding.items():
+                    self._tail[session_id] = events + self._tail.get(session_id, b"")
+                self._folding = {}
+                self._checkpoint = None
+            return
+        finally:
+            connection.close()
+        with self._lock:
+            self._folding = {}
+            self._checkpoint = None
+        for name in self._segments():
+            if _first_seq(name) <= seq:
+                os.remove(os.path.join(self.directory, name))
+        # Free the folded events a session at a time; dropping the whole
+        # tail at once would hold the interpreter for a noticeable pause.
+        while folding:
+            folding.popitem()
+
+    def _open_segment(self, first_seq: int) -> None:
+        name = f"{SEGMENT_PREFIX}{first_seq:012d}{SEGMENT_SUFFIX}"
+        self._segment = open(os.path.join(self.directory, name), "ab")
+
+    def _segments(self) -> List[str]:
+        return sorted(
+            name
+            for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _recover(self) -> None:
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            connection.execute(statement)
+        row = connection.execute(SELECT_CHECKPOINT).fetchone()
+        self._seq = row[0] if row else 0
+        for name in self._segments():
+            self._replay_segment(os.path.join(self.directory, name))
+        self._durable_seq = self._seq
+        self._since_snapshot = sum(lines.count(b"\n") for lines in self._tail.values())
+        self._snapshot_requested = self._since_snapshot >= self.snapshot_every
+
+    def _replay_segment(self, path: str) -> None:
+        with open(path, "rb+") as handle:
+            offset = 0
+            for line in handle:
+                try:
+                    seq, session_id, event = json.loads(line)
+                except ValueError:
+                    handle.truncate(offset)
+                    return
+                offset += len(line)
+                if seq <= self._seq:
+                    continue
+                if not line.endswith(b"\n"):
+                    line += b"\n"
+                self._file(session_id, line, event["op"] == "reset")
+                self._seq = seq
+
+
+def _events(lines: bytes) -> Iterator[Tuple[int, Dict[str, object]]]:
+    """(seq, event) for each of a session's journal lines."""
+    for line in lines.splitlines():
+        seq, _, event = json.loads(line)
+        yield seq, event
+
+
+def _first_seq(segment: str) -> int:
+    return int(segment[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from array import array
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+BOARDS = ("dex", "level", "captures", "efficiency")
+# Scores are stored as 31-bit integers; efficiency is captures per million nets.
+MAX_SCORE = (1 << 31) - 1
+EFFICIENCY_SCALE = 1_000_000
+
+
+class RankedKeys:
+    """Sorted int64 keys in bounded chunks with positional lookups.
+
+    Keys live in sorted ``array('q')`` chunks of at most ``2 * load``
+    entries, with a Fenwick tree over the chunk lengths. Adding or removing
+    a key is a bisection to its chunk plus a short memmove inside it, the
+    rank of a key is a Fenwick prefix sum plus a bisection, and the keys
+    from rank r onwards are found in O(log n) and then walked in order.
+    """
+
+    def __init__(self, load: int = 1000) -> None:
+        self.load = load
+        self._chunks: List[array] = []
+        self._maxes: List[int] = []
+        self._tree: List[int] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key: int) -> None:
+        if not self._chunks:
+            self._chunks.append(array("q", [key]))
+            self._maxes.append(key)
+            self._len = 1
+            self._rebuild_tree()
+            return
+        index = min(bisect_left(self._maxes, key), len(self._chunks) - 1)
+        chunk = self._chunks[index]
+        insort(chunk, key)
+        self._maxes[index] = chunk[-1]
+        self._len += 1
+        if len(chunk) > 2 * self.load:
+            self._chunks[index : index + 1] = [chunk[: self.load], chunk[self.load :]]
+            self._maxes[index : index + 1] = [chunk[self.load - 1], chunk[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(index, 1)
+
+    def remove(self, key: int) -> bool:
+        index = bisect_left(self._maxes, key)
+        if index == len(self._chunks):
+            return False
+        chunk = self._chunks[index]
+        position = bisect_left(chunk, key)
+        if position == len(chunk) or chunk[position] != key:
+            return False
+        del chunk[position]
+        self._len -= 1
+        if chunk:
+            self._maxes[index] = chunk[-1]
+            self._tree_add(index, -1)
+        else:
+            del self._chunks[index]
+            del self._maxes[index]
+            self._rebuild_tree()
+        return True
+
+    def rank(self, key: int) -> int:
+        """Number of keys smaller than ``key``."""
+        index = bisect_left(self._maxes, key)
+        if index == len(self._chunks):
+            return self._len
+        return self._prefix(index) + bisect_left(self._chunks[index], key)
+
+    def islice(self, start: int, count: int) -> Iterator[int]:
+        """Up to ``count`` keys in order, starting at rank ``start``."""
+        if count <= 0 or start >= self._len:
+            return
+        index, offset = self._locate(start)
+        while count > 0 and index < len(self._chunks):
+            chunk = self._chunks[index]
+            taken = chunk[offset : offset + count]
+            yield from taken
+            count -= len(taken)
+            index, offset = index + 1, 0
+
+    def _rebuild_tree(self) -> None:
+        tree = [len(chunk) for chunk in self._chunks]
+        for index in range(len(tree)):
+            parent = index | (index + 1)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        self._tree = tree
+
+    def _tree_add(self, index: int, delta: int) -> None:
+        tree = self._tree
+        while index < len(tree):
+            tree[index] += delta
+            index |= index + 1
+
+    def _prefix(self, index: int) -> int:
+        """Total length of the chunks before ``index``."""
+        total = 0
+        index -= 1
+        while index >= 0:
+            total += self._tree[index]
+            index = (index & (index + 1)) - 1
+        return total
+
+    def _locate(self, rank: int) -> Tuple[int, int]:
+        """(chunk, offset) of the key at ``rank``, by descending the tree."""
+        tree = self._tree
+        index = -1
+        step = 1 << max(0, len(tree).bit_length() - 1)
+        while step:
+            probe = index + step
+            if probe < len(tree) and tree[probe] <= rank:
+                rank -= tree[probe]
+                index = probe
+            step >>= 1
+        return index + 1, rank
+
+
+class Leaderboards:
+    """Per-board player rankings, updated as players' scores change.
+
+    Each board keeps one key per ranked player, ``(MAX_SCORE - score)``
+    in the high bits and the player's number in the low 32, so ascending
+    key order is descending score with lower numbers first on ties.
+    Players are numbered when they first get a score and shown by an
+    opaque public id, never by session id. A score of None takes the player
+    off the board; a player off every board gives up their number, which
+    the next new player reuses, so memory follows the ranked players rather
+    than every session ever seen.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced = 0
+        self._numbers: Dict[str, int] = {}
+        self._sessions: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._boards = {board: RankedKeys() for board in BOARDS}
+        self._scores: Dict[str, array] = {board: array("i") for board in BOARDS}
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def update(self, session_id: str, scores: Dict[str, Optional[int]]) -> None:
+        with self._lock:
+            self._update(session_id, scores)
+
+    def seed(self, session_id: str, scores: Dict[str, Optional[int]]) -> None:
+        """Rank a player not seen yet; a player already updated is newer."""
+        with self._lock:
+            if session_id not in self._numbers:
+                self._update(session_id, scores)
+
+    def sync(
+        self,
+        changes: Callable[[int], Iterable[Tuple[int, str, Dict[str, Optional[int]]]]],
+    ) -> None:
+        """Apply the scores another process stored since the last sync.
+
+        ``changes(seq)`` yields (seq, session id, scores) for every score
+        row stored after ``seq``, in order; boards missing from a row are
+        taken off.
+        """
+        with self._sync_lock:
+            for seq, session_id, scores in changes(self._synced):
+                self.update(session_id, {board: scores.get(board) for board in BOARDS})
+                self._synced = seq
+
+    def _update(self, session_id: str, scores: Dict[str, Optional[int]]) -> None:
+        number = self._numbers.get(session_id)
+        if number is None:
+            if all(score is None for score in scores.values()):
+                return
+            if self._free:
+                number = self._free.pop()
+                self._sessions[number] = session_id
+            else:
+                number = len(self._sessions)
+                self._sessions.append(session_id)
+                for column in self._scores.values():
+                    column.append(-1)
+            self._numbers[session_id] = number
+        for board, score in scores.items():
+            score = -1 if score is None else min(MAX_SCORE, max(0, score))
+            column = self._scores[board]
+            previous = column[number]
+            if score == previous:
+                continue
+            keys = self._boards[board]
+            if previous >= 0:
+                keys.remove(_key(previous, number))
+            if score >= 0:
+                keys.add(_key(score, number))
+            column[number] = score
+        if all(column[number] < 0 for column in self._scores.values()):
+            del self._numbers[session_id]
+            self._sessions[number] = None
+            self._free.append(number)
+
+    def size(self, board: str) -> int:
+        return len(self._boards[board])
+
+    def top(
+        self, board: str, limit: int = 10, offset: int = 0
+    ) -> List[Tuple[int, str, int]]:
+        """(rank, public id, score) for ranks ``offset + 1`` onwards.
+
+        Tied scores share the rank of the first player holding them.
+        """
+        with self._lock:
+            keys = self._boards[board]
+            entries = []
+            rank = 0
+            last = None
+            for key in keys.islice(offset, limit):
+                score = MAX_SCORE - (key >> 32)
+                if score != last:
+                    rank = keys.rank(_key(score, 0)) + 1
+                    last = score
+                session_id = self._sessions[key & 0xFFFFFFFF]
+                entries.append((rank, public_id(session_id), score))
+            return entries
+
+    def rank(self, board: str, session_id: str) -> Optional[Tuple[int, int]]:
+        """(rank, score) of a player, or None when they are not on the board."""
+        with self._lock:
+            number = self._numbers.get(session_id)
+            if number is None or self._scores[board][number] < 0:
+                return None
+            score = self._scores[board][number]
+            return self._boards[board].rank(_key(score, 0)) + 1, score
+
+
+def _key(score: int, number: int) -> int:
+    return (MAX_SCORE - score) << 32 | number
+
+
+def public_id(session_id: str) -> str:
+    return hashlib.blake2b(session_id.encode(), digest_size=6).hexdigest()
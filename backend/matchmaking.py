@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import math
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from battle import STAT_NAMES
+
+MAX_LEVEL = 100
+BAND_WIDTH = 10
+BAND_COUNT = 5
+LEVEL_SPREAD = 2
+# Stats grow 5% of their base value per level above 1.
+LEVEL_SCALE = array("d", (1 + 0.05 * (level - 1) for level in range(MAX_LEVEL + 1)))
+
+PoolKey = Tuple[Optional[str], str, str]
+
+
+def level_band(level: int) -> int:
+    return min(BAND_COUNT - 1, max(0, (level - 1) // BAND_WIDTH))
+
+
+class LevelTable:
+    """Per-species stats for every level, built once per species on demand."""
+
+    def __init__(self, max_species: int = 20_000) -> None:
+        self.max_species = max_species
+        self._lock = threading.Lock()
+        self._tables: "OrderedDict[str, array]" = OrderedDict()
+
+    def stats(self, bird, level: int) -> Dict[str, int]:
+        level = min(MAX_LEVEL, max(1, level))
+        table = self._table(bird)
+        start = (level - 1) * len(STAT_NAMES)
+        return dict(zip(STAT_NAMES, table[start : start + len(STAT_NAMES)]))
+
+    def _table(self, bird) -> array:
+        with self._lock:
+            table = self._tables.get(bird.id)
+            if table is not None:
+                self._tables.move_to_end(bird.id)
+                return table
+        base = bird.stat_values
+        table = array(
+            "i",
+            (
+                math.floor(value * LEVEL_SCALE[level])
+                for level in range(1, MAX_LEVEL + 1)
+                for value in base
+            ),
+        )
+        with self._lock:
+            self._tables[bird.id] = table
+            while len(self._tables) > self.max_species:
+                self._tables.popitem(last=False)
+        return table
+
+
+class Matchmaker:
+    """Opponent pools per (area, time slot, weather) split into level bands.
+
+    Species are ranked by base stat total and cut into ``BAND_COUNT`` tiers
+    of equal size, so a player in level band b meets species from tier b
+    (scaled to about the player's level). A cell's pools are built from the
+    spawn index the first time it is asked for, which spreads the work over
+    time slots as the clock advances, and a pick is then a random index into
+    the nearest non-empty band. Catalog edits drop the pools so they are
+    rebuilt against the new species.
+    """
+
+    def __init__(self, spawn_index, stat_total: Callable[[object], int]) -> None:
+        self._spawn_index = spawn_index
+        self._stat_total = stat_total
+        self._lock = threading.Lock()
+        self._thresholds: List[int] = []
+        self._tiers: Dict[int, int] = {}
+        self._pools: Dict[PoolKey, List[array]] = {}
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        index = self._spawn_index
+        totals = sorted(
+            self._stat_total(index.ref(species_id))
+            for species_id in index.species_ids()
+        )
+        thresholds = (
+            [totals[len(totals) * tier // BAND_COUNT] for tier in range(1, BAND_COUNT)]
+            if totals
+            else []
+        )
+        with self._lock:
+            self._thresholds = thresholds
+            self._tiers = {}
+            self._pools = {}
+
+    def pick(
+        self,
+        rng,
+        level: int,
+        area_id: Optional[str],
+        time_slot: str,
+        weather: str,
+    ) -> Optional[Tuple[object, int]]:
+        """An opponent species and its level, or None if nothing can spawn.
+
+        Without an area every species is eligible, whatever the slot.
+        """
+        pools = self._cell(area_id, time_slot, weather)
+        band = level_band(level)
+        for offset in range(BAND_COUNT):
+            for candidate in (band - offset, band + offset):
+                if 0 <= candidate < BAND_COUNT and pools[candidate]:
+                    pool = pools[candidate]
+                    species_id = pool[rng.randrange(len(pool))]
+                    opponent_level = level + rng.randint(-LEVEL_SPREAD, LEVEL_SPREAD)
+                    return (
+                        self._spawn_index.species(species_id),
+                        min(MAX_LEVEL, max(1, opponent_level)),
+                    )
+        return None
+
+    def _cell(
+        self, area_id: Optional[str], time_slot: str, weather: str
+    ) -> List[array]:
+        key = (area_id, time_slot, weather) if area_id is not None else (None, "", "")
+        pools = self._pools.get(key)
+        if pools is not None:
+            return pools
+        index = self._spawn_index
+        if area_id is None:
+            species_ids: Sequence[int] = index.species_ids()
+        else:
+            species_ids = index.candidate_ids(area_id, time_slot, weather)
+        pools = [array("i") for _ in range(BAND_COUNT)]
+        for species_id in species_ids:
+            pools[self._tier(species_id)].append(species_id)
+        with self._lock:
+            self._pools[key] = pools
+        return pools
+
+    def _tier(self, species_id: int) -> int:
+        tier = self._tiers.get(species_id)
+        if tier is None:
+            total = self._stat_total(self._spawn_index.ref(species_id))
+            tier = self._tiers[species_id] = bisect_right(self._thresholds, total)
+        return tier
@@ -0,0 +1,252 @@
+"""Monte Carlo matchup simulator over the whole bird roster.
+
+Replays the battle rules from battle.py for every (player, opponent) pair,
+vectorized over NumPy arrays. Both sides pick uniformly random moves and the
+player acts first each round, as in the game.
+
+Usage: python matchups.py [--trials 2000] [--seed 7] [--out matchups.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from battle import (
+    ATTACK,
+    DEFENSE,
+    HP,
+    SPECIAL_ATTACK,
+    SPECIAL_DEFENSE,
+    STAT_INDEX,
+    STAT_NAMES,
+)
+
+
+EFFECT_NONE, EFFECT_HEAL, EFFECT_BUFF = range(3)
+# Trial counts the API serves, so every cached result is one of a few.
+TRIAL_PRESETS = (200, 1000, 5000)
+
+logger = logging.getLogger(__name__)
+
+
+class Roster:
+    def __init__(self, birds: Sequence[object]) -> None:
+        self.ids = [bird.id for bird in birds]
+        width = max((len(bird.moves) for bird in birds), default=1)
+        count = len(birds)
+        self.stats = np.zeros((count, len(STAT_NAMES)), dtype=np.float64)
+        self.move_count = np.zeros(count, dtype=np.int64)
+        self.power = np.zeros((count, width), dtype=np.float64)
+        self.special = np.zeros((count, width), dtype=bool)
+        self.effect = np.zeros((count, width), dtype=np.int8)
+        self.amount = np.zeros((count, width), dtype=np.float64)
+        self.buff_stat = np.full((count, width), -1, dtype=np.int8)
+        for row, bird in enumerate(birds):
+            self.stats[row] = bird.stat_values
+            self.move_count[row] = len(bird.moves)
+            for column, move in enumerate(bird.moves):
+                self.power[row, column] = move.get("power") or 0
+                self.special[row, column] = move.get("category") == "special"
+                if move.get("effect") == "heal":
+                    self.effect[row, column] = EFFECT_HEAL
+                    self.amount[row, column] = move.get("amount", 25)
+                elif move.get("effect") == "buff":
+                    self.effect[row, column] = EFFECT_BUFF
+                    self.amount[row, column] = move.get("amount", 10)
+                    self.buff_stat[row, column] = STAT_INDEX.get(
+                        move.get("stat", "Attack"), -1
+                    )
+
+
+def _apply_moves(roster, rng, attacker, defender, hp, buffs, active) -> None:
+    """One side's move for every live trial; mutates hp/buffs in place."""
+    rows = attacker[:, None]
+    choice = (rng.random(active.shape) * roster.move_count[rows]).astype(np.int64)
+    power = roster.power[rows, choice]
+    special = roster.special[rows, choice]
+    effect = roster.effect[rows, choice]
+    amount = roster.amount[rows, choice]
+    buff_stat = roster.buff_stat[rows, choice]
+    attacker_hp, defender_hp = hp
+    attacker_buffs, defender_buffs = buffs
+
+    heal = active & (effect == EFFECT_HEAL)
+    max_hp = roster.stats[attacker, HP][:, None]
+    attacker_hp[heal] = np.minimum(max_hp, attacker_hp + amount)[heal]
+
+    for stat in range(len(STAT_NAMES)):
+        boosted = active & (effect == EFFECT_BUFF) & (buff_stat == stat)
+        attacker_buffs[..., stat] += np.where(boosted, amount, 0)
+
+    attack_stat = np.where(
+        special,
+        roster.stats[attacker, SPECIAL_ATTACK][:, None]
+        + attacker_buffs[..., SPECIAL_ATTACK],
+        roster.stats[attacker, ATTACK][:, None] + attacker_buffs[..., ATTACK],
+    )
+    defense_stat = np.where(
+        special,
+        roster.stats[defender, SPECIAL_DEFENSE][:, None]
+        + defender_buffs[..., SPECIAL_DEFENSE],
+        roster.stats[defender, DEFENSE][:, None] + defender_buffs[..., DEFENSE],
+    )
+    base = power * 0.6 + attack_stat * 0.3 - defense_stat * 0.25
+    variance = 0.85 + rng.random(active.shape) * 0.3
+    damage = np.maximum(4, np.floor(base * variance))
+    hits = active & (power > 0)
+    defender_hp[hits] = np.maximum(0, defender_hp - damage)[hits]
+
+
+def simulate_pairs(
+    roster: Roster,
+    players: np.ndarray,
+    opponents: np.ndarray,
+    trials: int,
+    rng: np.random.Generator,
+    max_rounds: int = 100,
+) -> Tuple[np.ndarray, np.ndarray]:
+    shape = (len(players), trials)
+    player_hp = np.broadcast_to(roster.stats[players, HP][:, None], shape).copy()
+    opponent_hp = np.broadcast_to(roster.stats[opponents, HP][:, None], shape).copy()
+    player_buffs = np.zeros(shape + (len(STAT_NAMES),))
+    opponent_buffs = np.zeros(shape + (len(STAT_NAMES),))
+    rounds = np.zeros(shape, dtype=np.int64)
+    won = np.zeros(shape, dtype=bool)
+    active = np.ones(shape, dtype=bool)
+    for _ in range(max_rounds):
+        rounds += active
+        _apply_moves(
+            roster,
+            rng,
+            players,
+            opponents,
+            (player_hp, opponent_hp),
+            (player_buffs, opponent_buffs),
+            active,
+        )
+        won |= active & (opponent_hp == 0)
+        active &= opponent_hp > 0
+        _apply_moves(
+            roster,
+            rng,
+            opponents,
+            players,
+            (opponent_hp, player_hp),
+            (opponent_buffs, player_buffs),
+            active,
+        )
+        active &= player_hp > 0
+        if not active.any():
+            break
+    return won.mean(axis=1), rounds.mean(axis=1)
+
+
+def simulate_matchups(
+    birds: Sequence[object],
+    trials: int = 2000,
+    seed: Optional[int] = None,
+    chunk_cells: int = 2_000_000,
+) -> Dict[str, object]:
+    roster = Roster(birds)
+    count = len(roster.ids)
+    rng = np.random.default_rng(seed)
+    players, opponents = np.divmod(np.arange(count * count), count)
+    win_rate = np.empty(count * count)
+    avg_turns = np.empty(count * count)
+    step = max(1, chunk_cells // trials)
+    for start in range(0, count * count, step):
+        window = slice(start, start + step)
+        win_rate[window], avg_turns[window] = simulate_pairs(
+            roster, players[window], opponents[window], trials, rng
+        )
+    return {
+        "birds": roster.ids,
+        "trials": trials,
+        "win_rate": np.round(win_rate.reshape(count, count), 4).tolist(),
+        "avg_turns": np.round(avg_turns.reshape(count, count), 2).tolist(),
+    }
+
+
+class MatchupCache:
+    """Simulation results keyed by (catalog hash, trials), built off-thread.
+
+    ``get`` never simulates on the caller's thread: a missing result is
+    queued for one background worker, and until it lands the caller gets
+    the newest result for the same trial count on an older catalog, or
+    None. The lock only guards the maps, never a simulation.
+    """
+
+    def __init__(self, max_entries: int = 8) -> None:
+        self._lock = threading.Lock()
+        self._results: Dict[Tuple[str, int], Dict[str, object]] = {}
+        self._latest: Dict[int, Dict[str, object]] = {}
+        self._queued: Dict[Tuple[str, int], Sequence[object]] = {}
+        self._worker: Optional[threading.Thread] = None
+        self._max_entries = max_entries
+
+    def get(
+        self, catalog_hash: str, birds: Sequence[object], trials: int
+    ) -> Tuple[Optional[Dict[str, object]], bool]:
+        """(result, fresh): fresh is False while the result is being built."""
+        key = (catalog_hash, trials)
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                return result, True
+            self._queued.setdefault(key, birds)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, daemon=True)
+                self._worker.start()
+            return self._latest.get(trials), False
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                if not self._queued:
+                    self._worker = None
+                    return
+                key, birds = next(iter(self._queued.items()))
+            catalog_hash, trials = key
+            try:
+                result = {"catalog": catalog_hash, **simulate_matchups(birds, trials)}
+            except Exception:
+                logger.exception("matchup simulation failed for %d trials", trials)
+                result = None
+            with self._lock:
+                del self._queued[key]
+                if result is None:
+                    continue
+                if len(self._results) >= self._max_entries:
+                    self._results.pop(next(iter(self._results)))
+                self._results[key] = result
+                self._latest[trials] = result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from app import catalogs
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", help="write the full result as JSON")
+    args = parser.parse_args(argv)
+
+    result = simulate_matchups(catalogs.current.birds, args.trials, args.seed)
+    if args.out:
+        with open(args.out, "w") as handle:
+            json.dump(result, handle)
+    overall = np.mean(result["win_rate"], axis=1)
+    turns = np.mean(result["avg_turns"], axis=1)
+    print(f"{'bird':<28} {'win rate':>8} {'turns':>6}")
+    for row in np.argsort(-overall):
+        print(f"{result['birds'][row]:<28} {overall[row]:>8.3f} {turns[row]:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
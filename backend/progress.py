@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List
+
+from search_index import SearchIndex
+
+
+GROUP_KINDS = ("area", "habitat", "rarity", "category")
+
+
+class ProgressGroups:
+    """The collection groups of a catalog and how many species each holds.
+
+    A species counts towards its rarity, its category, each of its habitats
+    and each area it can spawn in (an area sharing one of its habitats).
+    Group keys are ``"kind:value"`` strings, the form player counters use.
+    """
+
+    def __init__(self, search: SearchIndex, areas: Iterable[Dict[str, object]]) -> None:
+        self._habitat_areas: Dict[str, List[str]] = {}
+        self.totals: Dict[str, Dict[str, int]] = {kind: {} for kind in GROUP_KINDS}
+        for area in areas:
+            for habitat in area["habitats"]:
+                self._habitat_areas.setdefault(habitat, []).append(area["id"])
+            self.totals["area"][area["id"]] = search.count("habitats", area["habitats"])
+        for kind, field in (
+            ("habitat", "habitats"),
+            ("rarity", "rarity"),
+            ("category", "category"),
+        ):
+            for value in search.values(field):
+                self.totals[kind][value] = search.count(field, [value])
+
+    def keys(self, bird) -> List[str]:
+        areas = {
+            area
+            for habitat in bird.habitats
+            for area in self._habitat_areas.get(habitat, ())
+        }
+        return [
+            f"rarity:{bird.rarity}",
+            f"category:{bird.category}",
+            *(f"habitat:{habitat}" for habitat in bird.habitats),
+            *(f"area:{area}" for area in sorted(areas)),
+        ]
+
+    def report(self, counts: Dict[str, int]) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Caught and total species per group, from a player's counters."""
+        return {
+            kind: {
+                value: {"caught": counts.get(f"{kind}:{value}", 0), "total": total}
+                for value, total in totals.items()
+            }
+            for kind, totals in self.totals.items()
+        }
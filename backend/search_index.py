@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+TERM_FIELDS = ("category", "size", "rarity", "temperament")
+LIST_FIELDS = ("traits", "habitats", "active_times", "weather")
+SEARCH_FIELDS = TERM_FIELDS + LIST_FIELDS
+
+StatRange = Tuple[str, Optional[int], Optional[int]]
+
+
+class SearchIndex:
+    """Inverted indexes and sorted stat columns over species records.
+
+    Every field value has a posting list of document numbers (positions in
+    catalog order), and every stat a column of (value, document) pairs
+    sorted by value. A query starts from its most selective condition, a
+    posting list or a stat range found by bisection, and checks the other
+    conditions per document against compact columns, so it costs about the
+    size of that smallest candidate set rather than of the catalog.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        terms: Dict[str, List[str]],
+        term_ids: Dict[str, Sequence[int]],
+        term_lists: Dict[str, Tuple[Sequence[int], Sequence[int]]],
+        stats: Dict[str, Sequence[int]],
+        postings: Dict[str, List[Sequence[int]]],
+        sorted_stats: Dict[str, Tuple[Sequence[int], Sequence[int]]],
+    ) -> None:
+        """Wrap compiled columns; nothing is computed per document.
+
+        ``terms`` holds each field's values in term id order and
+        ``postings`` each value's ascending document numbers, in the same
+        order. A term field has a term id per document in ``term_ids``; a
+        list field has an (offsets, term ids) pair in ``term_lists``,
+        document ``i`` owning the term ids from ``offsets[i]`` up to
+        ``offsets[i + 1]``. ``stats`` holds each stat's value per document
+        and ``sorted_stats`` the (values, documents) pair sorted by value.
+        """
+        self.ids = ids
+        self._terms: Dict[str, Dict[str, int]] = {
+            field: {value: term for term, value in enumerate(terms[field])}
+            for field in SEARCH_FIELDS
+        }
+        self._postings: Dict[str, Dict[str, Sequence[int]]] = {
+            field: dict(zip(terms[field], postings[field])) for field in SEARCH_FIELDS
+        }
+        self._term_ids = term_ids
+        self._term_lists = term_lists
+        self._stats = stats
+        self._sorted = sorted_stats
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def values(self, field: str) -> List[str]:
+        return list(self._terms[field])
+
+    def count(self, field: str, values: Sequence[str]) -> int:
+        """Number of documents with any of ``values`` in ``field``."""
+        postings = [
+            self._postings[field][value]
+            for value in set(values)
+            if value in self._postings[field]
+        ]
+        if len(postings) == 1:
+            return len(postings[0])
+        return len(set().union(*postings))
+
+    def search(
+        self,
+        terms: Optional[Dict[str, Sequence[str]]] = None,
+        stats: Sequence[StatRange] = (),
+        sort: Optional[str] = None,
+        descending: bool = False,
+    ) -> List[int]:
+        """Documents matching every condition, in catalog or ``sort`` order.
+
+        ``terms`` maps a field to the values it may take (any of them; for
+        list fields, the species must have at least one). ``stats`` holds
+        inclusive (stat, low, high) ranges, either bound optional.
+        """
+        candidates: List[Tuple[int, Callable[[], Iterator[int]]]] = []
+        checks = []
+        stat_order = None
+        for field, wanted in (terms or {}).items():
+            postings = [self._postings[field].get(value) for value in set(wanted)]
+            postings = [docs for docs in postings if docs]
+            if not postings:
+                return []
+            candidates.append((sum(map(len, postings)), lambda p=postings: _union(p)))
+            term_ids = {
+                self._terms[field][value]
+                for value in wanted
+                if value in self._terms[field]
+            }
+            if field in TERM_FIELDS:
+                column = self._term_ids[field]
+                checks.append(lambda doc, c=column, t=term_ids: c[doc] in t)
+            else:
+                offsets, flat = self._term_lists[field]
+                checks.append(
+                    lambda doc, o=offsets, f=flat, t=term_ids: not t.isdisjoint(
+                        f[o[doc] : o[doc + 1]]
+                    )
+                )
+        for name, low, high in stats:
+            values, docs = self._sorted[name]
+            start = 0 if low is None else bisect_left(values, low)
+            end = len(values) if high is None else bisect_right(values, high)
+            if start >= end:
+                return []
+            candidates.append(
+                (end - start, lambda d=docs, s=start, e=end: iter(d[s:e]))
+            )
+            if name == sort:
+                stat_order = len(candidates) - 1
+            column = self._stats[name]
+            low = float("-inf") if low is None else low
+            high = float("inf") if high is None else high
+            checks.append(lambda doc, c=column, lo=low, hi=high: lo <= c[doc] <= hi)
+
+        if candidates:
+            driver = min(range(len(candidates)), key=lambda i: candidates[i][0])
+            docs = candidates[driver][1]()
+            # The driver's own condition holds for every document it yields.
+            del checks[driver]
+        else:
+            driver = None
+            docs = iter(self._sorted[sort][1] if sort else range(len(self.ids)))
+        matches = [doc for doc in docs if all(check(doc) for check in checks)]
+
+        if sort:
+            column = self._stats[sort]
+            ordered = driver is None or driver == stat_order
+            if descending:
+                matches.sort(key=lambda doc: (-column[doc], doc))
+            elif not ordered:
+                matches.sort(key=lambda doc: (column[doc], doc))
+        elif driver is not None and driver >= len(candidates) - len(stats):
+            # Stat ranges yield documents by value, not in catalog order.
+            matches.sort()
+        return matches
+
+
+def _union(postings: List[Sequence[int]]) -> Iterator[int]:
+    """Sorted posting lists merged, each document once."""
+    if len(postings) == 1:
+        yield from postings[0]
+        return
+    previous = None
+    for doc in heapq.merge(*postings):
+        if doc != previous:
+            yield doc
+            previous = doc
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+class _Session:
+    __slots__ = ("lock", "state", "last_seen", "evicted")
+
+    def __init__(self, state: Dict[str, object], now: float) -> None:
+        self.lock = threading.Lock()
+        self.state = state
+        self.last_seen = now
+        self.evicted = False
+
+
+class _Shard:
+    __slots__ = ("lock", "sessions")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.sessions: "OrderedDict[str, _Session]" = OrderedDict()
+
+
+class SessionStore:
+    """Session-keyed player state with sharded locking and idle eviction.
+
+    The shard lock only guards the session table; each session has its own
+    lock that is held while a request mutates its state, so requests for
+    different players never wait on each other. A new session's state is
+    built outside the shard lock. Shards evict on checkout, and a
+    background sweep every ``sweep_seconds`` evicts idle sessions from
+    shards nobody is visiting.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], Dict[str, object]],
+        shards: int = 64,
+        idle_seconds: float = 30 * 60,
+        max_sessions: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+        sweep_seconds: Optional[float] = 60.0,
+    ) -> None:
+        self._factory = factory
+        self._shards = [_Shard() for _ in range(shards)]
+        self._idle_seconds = idle_seconds
+        self._per_shard = max(1, max_sessions // shards)
+        self._clock = clock
+        self._closed = threading.Event()
+        if sweep_seconds:
+            threading.Thread(
+                target=self._sweep,
+                args=(sweep_seconds,),
+                name="session-sweep",
+                daemon=True,
+            ).start()
+
+    def __len__(self) -> int:
+        return sum(len(shard.sessions) for shard in self._shards)
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[zlib.crc32(session_id.encode()) % len(self._shards)]
+
+    def _checkout(self, session_id: str) -> _Session:
+        shard = self._shard(session_id)
+        now = self._clock()
+        with shard.lock:
+            entry = shard.sessions.get(session_id)
+            if entry is not None:
+                entry.last_seen = now
+                shard.sessions.move_to_end(session_id)
+                self._evict(shard, now)
+                return entry
+        # Building the state may read the journal; the shard's other
+        # sessions shouldn't wait for that. When two requests race to
+        # create the same session, the first one inserted wins.
+        state = self._factory(session_id)
+        with shard.lock:
+            entry = shard.sessions.setdefault(session_id, _Session(state, now))
+            entry.last_seen = now
+            shard.sessions.move_to_end(session_id)
+            self._evict(shard, now)
+        return entry
+
+    def _evict(self, shard: _Shard, now: float) -> None:
+        sessions = shard.sessions
+        while sessions:
+            session_id, entry = next(iter(sessions.items()))
+            idle = now - entry.last_seen > self._idle_seconds
+            if not idle and len(sessions) <= self._per_shard:
+                return
+            if entry.lock.locked():
+                return
+            entry.evicted = True
+            del sessions[session_id]
+
+    @contextmanager
+    def session(
+        self, session_id: str, write: bool = True
+    ) -> Iterator[Dict[str, object]]:
+        # ``write`` only matters to stores shared between processes; here
+        # every request holds the session's own lock either way.
+        while True:
+            entry = self._checkout(session_id)
+            entry.lock.acquire()
+            if not entry.evicted:
+                break
+            entry.lock.release()
+        try:
+            yield entry.state
+        finally:
+            entry.last_seen = self._clock()
+            entry.lock.release()
+
+    def drop(self, session_id: str) -> None:
+        shard = self._shard(session_id)
+        with shard.lock:
+            entry = shard.sessions.pop(session_id, None)
+            if entry:
+                entry.evicted = True
+
+    def evict_idle(self) -> int:
+        now = self._clock()
+        evicted = 0
+        for shard in self._shards:
+            with shard.lock:
+                before = len(shard.sessions)
+                self._evict(shard, now)
+                evicted += before - len(shard.sessions)
+        return evicted
+
+    def session_ids(self) -> List[str]:
+        ids: List[str] = []
+        for shard in self._shards:
+            with shard.lock:
+                ids.extend(shard.sessions)
+        return ids
+
+    def close(self) -> None:
+        self._closed.set()
+
+    def _sweep(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            self.evict_idle()
@@ -0,0 +1,229 @@
+"""Offline player simulation for balance and capacity runs.
+
+Simulated players play whole days (every time slot) through the same rules
+the API uses: ``eligible_birds`` for each area, ``throw_net`` for captures,
+``release_bird`` for box duplicates, matchmade battles resolved by
+``resolve_turn`` and ``award_level`` for wins. No HTTP is involved.
+
+Players are split into shards run by a process pool. Each shard seeds its
+own RNG from ``--seed`` and the shard index, so a run is reproducible
+whatever ``--workers`` is. Totals are merged as shards finish and the
+output file is rewritten after each one, so a long run can be read while
+it is still going. The output is a numpy ``.npz`` of named columns:
+
+- ``species``, ``attempts``, ``catches``: nets thrown and birds caught per species
+- ``dex_by_day``: players by day (row) and dex size (column)
+- ``days_to_complete``: players by the day their dex filled (0: not within the run)
+- ``level_counts``: held birds by level at the end of the run
+- ``battles``: battles fought and won
+- ``players``, ``days``: run size
+
+Usage: python simulate.py --players 10000 --days 30 [--workers 4] [--out simulation.npz]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+from multiprocessing import Pool
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+
+# Simulated players are never journaled and never share state.
+os.environ["BIRDMON_DATA_DIR"] = ""
+os.environ["BIRDMON_STATE_BACKEND"] = "memory"
+
+import app as birdmon  # noqa: E402
+from battle import Battle, Combatant, resolve_turn  # noqa: E402
+from changelog import ChangeLog  # noqa: E402
+from matchmaking import MAX_LEVEL  # noqa: E402
+from species_catalog import TIME_SLOTS  # noqa: E402
+
+
+catalog = birdmon.catalogs.current
+SHARD_SIZE = 250
+# Nets thrown at an encounter the player still needs for the dex, and at one
+# already caught.
+NEW_SPECIES_NETS = 3
+KNOWN_SPECIES_NETS = 1
+MAX_BATTLE_TURNS = 200
+
+Shard = Tuple[int, int, int, int]
+
+
+def empty_totals(days: int) -> Dict[str, np.ndarray]:
+    species = len(catalog.birds)
+    return {
+        "attempts": np.zeros(species, dtype=np.int64),
+        "catches": np.zeros(species, dtype=np.int64),
+        "dex_by_day": np.zeros((days, species + 1), dtype=np.int64),
+        "days_to_complete": np.zeros(days + 1, dtype=np.int64),
+        "level_counts": np.zeros(MAX_LEVEL + 1, dtype=np.int64),
+        "battles": np.zeros(2, dtype=np.int64),
+    }
+
+
+def new_state(rng: random.Random) -> Dict[str, object]:
+    state: Dict[str, object] = {"changes": ChangeLog()}
+    birdmon.reset_state(state, rng)
+    return state
+
+
+def explore(
+    state: Dict[str, object],
+    rng: random.Random,
+    totals: Dict[str, np.ndarray],
+    positions: Dict[str, int],
+) -> None:
+    """Visit every area once in the current time slot."""
+    for area in catalog.areas:
+        for bird in birdmon.eligible_birds(state, area["id"]):
+            position = positions[bird.id]
+            nets = KNOWN_SPECIES_NETS if bird.id in state["dex"] else NEW_SPECIES_NETS
+            for _ in range(nets):
+                result = birdmon.throw_net(state, bird, rng)
+                totals["attempts"][position] += 1
+                if result["success"]:
+                    totals["catches"][position] += 1
+                    # Keep one boxed copy of a species that is not in the team.
+                    if result["location"] == "box" and (
+                        bird.id in state["team"] or state["box"].count(bird.id) > 1
+                    ):
+                        birdmon.release_bird(state, bird.id)
+                    break
+
+
+def battle(
+    state: Dict[str, object], rng: random.Random, totals: Dict[str, np.ndarray]
+) -> None:
+    """Train the lowest-level team member against a matchmade opponent."""
+    if not state["team"]:
+        return
+    levels = state["levels"]
+    bird_id = min(state["team"], key=lambda team_id: levels.get(team_id, 1))
+    level = levels.get(bird_id, 1)
+    area_id = rng.choice(catalog.areas)["id"]
+    match = birdmon.pick_opponent(
+        level,
+        area_id,
+        TIME_SLOTS[state["time_index"]],
+        state["area_weather"].get(area_id, "Clear"),
+        rng,
+    )
+    if match is None:
+        return
+    opponent, opponent_level = match
+    bird = catalog.birds.get(bird_id)
+    fight = Battle(
+        "simulation",
+        Combatant(bird, catalog.level_table.stats(bird, level)),
+        Combatant(opponent, catalog.level_table.stats(opponent, opponent_level)),
+    )
+    for _ in range(MAX_BATTLE_TURNS):
+        resolve_turn(fight, rng.randrange(len(fight.player.moves)), rng)
+        if fight.status != "in-progress":
+            break
+    totals["battles"][0] += 1
+    if fight.status == "won":
+        totals["battles"][1] += 1
+        birdmon.award_level(state, bird_id)
+
+
+def run_shard(shard: Shard) -> Dict[str, np.ndarray]:
+    index, players, days, seed = shard
+    rng = random.Random(f"{seed}:{index}")
+    totals = empty_totals(days)
+    positions = {bird.id: position for position, bird in enumerate(catalog.birds)}
+    complete = len(positions)
+    for _ in range(players):
+        state = new_state(rng)
+        completed_on = 0
+        for day in range(days):
+            for _ in TIME_SLOTS:
+                explore(state, rng, totals, positions)
+                battle(state, rng, totals)
+                birdmon.advance_clock(state, rng)
+            totals["dex_by_day"][day, len(state["dex"])] += 1
+            if not completed_on and len(state["dex"]) == complete:
+                completed_on = day + 1
+        totals["days_to_complete"][completed_on] += 1
+        for bird_id in [*state["team"], *state["box"]]:
+            level = min(MAX_LEVEL, state["levels"].get(bird_id, 1))
+            totals["level_counts"][level] += 1
+    return totals
+
+
+def shards(players: int, days: int, seed: int) -> Iterator[Shard]:
+    for index, start in enumerate(range(0, players, SHARD_SIZE)):
+        yield index, min(SHARD_SIZE, players - start), days, seed
+
+
+def write(path: str, totals: Dict[str, np.ndarray], players: int, days: int) -> None:
+    columns = {
+        "species": np.array([bird.id for bird in catalog.birds]),
+        **totals,
+        "players": np.array([players], dtype=np.int64),
+        "days": np.array([days], dtype=np.int64),
+    }
+    partial = path + ".partial"
+    with open(partial, "wb") as handle:
+        np.savez_compressed(handle, **columns)
+    os.replace(partial, path)
+
+
+def summarize(totals: Dict[str, np.ndarray], players: int, days: int) -> None:
+    sizes = np.arange(totals["dex_by_day"].shape[1])
+    final = totals["dex_by_day"][-1]
+    attempts = totals["attempts"].sum()
+    completed = totals["days_to_complete"][1:]
+    print(f"players            {players}")
+    print(f"days               {days}")
+    print(
+        f"dex after last day {(final * sizes).sum() / players:.1f} / {len(sizes) - 1} (mean)"
+    )
+    print(f"dex completed      {completed.sum() / players:.1%} of players")
+    if completed.sum():
+        cumulative = np.cumsum(completed)
+        median = int(np.searchsorted(cumulative, cumulative[-1] / 2)) + 1
+        print(f"days to fill dex   {median} (median of those who did)")
+    print(
+        f"catch rate         {totals['catches'].sum() / max(1, attempts):.1%} of {attempts} nets"
+    )
+    print(
+        f"battles won        {totals['battles'][1] / max(1, totals['battles'][0]):.1%}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="simulation.npz")
+    args = parser.parse_args()
+    if args.players < 1 or args.days < 1:
+        parser.error("--players and --days must be positive")
+
+    totals = empty_totals(args.days)
+    done = 0
+    start = time.perf_counter()
+    with Pool(args.workers) as pool:
+        for shard in pool.imap_unordered(
+            run_shard, shards(args.players, args.days, args.seed)
+        ):
+            for name, values in shard.items():
+                totals[name] += values
+            done += int(shard["days_to_complete"].sum())
+            write(args.out, totals, done, args.days)
+            print(f"\r{done}/{args.players} players", end="", flush=True)
+    elapsed = time.perf_counter() - start
+    print(f"\r{done * args.days} player-days in {elapsed:.1f}s -> {args.out}")
+    summarize(totals, args.players, args.days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+CellKey = Tuple[str, str, str]
+AliasTable = Tuple[array, array]
+
+
+def build_alias_table(weights: Sequence[float]) -> AliasTable:
+    """Walker/Vose alias table: O(n) to build, O(1) per weighted draw."""
+    n = len(weights)
+    total = float(sum(weights))
+    scaled = [weight * n / total for weight in weights]
+    prob = array("d", [1.0] * n)
+    alias = array("i", range(n))
+    small = [i for i, value in enumerate(scaled) if value < 1.0]
+    large = [i for i, value in enumerate(scaled) if value >= 1.0]
+    while small and large:
+        low, high = small.pop(), large.pop()
+        prob[low] = scaled[low]
+        alias[low] = high
+        scaled[high] -= 1.0 - scaled[low]
+        (small if scaled[high] < 1.0 else large).append(high)
+    return prob, alias
+
+
+class SpawnIndex:
+    """(time slot x weather x habitat) table of species ids, built once.
+
+    Species get a stable integer id on insertion. Each habitat cell holds the
+    ids of species that can appear there, and every area keeps a merged
+    candidate array per (time slot, weather) so an expedition lookup is a
+    single dict hit regardless of catalog size.
+
+    Each species is stored as an opaque ``ref`` (the bird itself when added
+    with ``add_bird``) and turned back into a species by ``resolve``.
+    ``compiled`` wraps candidate arrays computed ahead of time instead; such
+    an index has no habitat cells, so species and areas can't be added to it.
+
+    Encounters are weighted by rarity: a species weighs
+    ``rarity_weights[rarity]`` times the area's ``rarity_modifiers`` entry
+    for that rarity (1 when absent; every species weighs 1 without
+    ``rarity_weights``). Alias tables are built lazily per area cell and
+    dropped whenever the cell changes, so drawing k distinct species costs
+    O(k) expected time however large the cell is.
+    """
+
+    def __init__(
+        self,
+        birds: Iterable[object],
+        areas: Iterable[Dict[str, object]],
+        time_slots: Sequence[str],
+        weather_types: Sequence[str],
+        resolve: Optional[Callable[[object], object]] = None,
+        rarity_weights: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self._resolve = resolve or (lambda ref: ref)
+        self.rarity_weights = rarity_weights
+        self.time_slots = list(time_slots)
+        self.weather_types = list(weather_types)
+        self._species: List[Optional[object]] = []
+        self._rarities: List[Optional[str]] = []
+        self._ids: Dict[str, int] = {}
+        self._cells: Dict[CellKey, array] = {}
+        self._areas: Dict[str, Tuple[str, ...]] = {}
+        self._modifiers: Dict[str, Dict[str, float]] = {}
+        self._area_cells: Dict[CellKey, Sequence[int]] = {}
+        self._alias: Dict[CellKey, AliasTable] = {}
+        for area in areas:
+            self.add_area(area)
+        for bird in birds:
+            self.add_bird(bird)
+
+    @classmethod
+    def compiled(
+        cls,
+        ids: Sequence[str],
+        rarities: Sequence[str],
+        areas: Iterable[Dict[str, object]],
+        time_slots: Sequence[str],
+        weather_types: Sequence[str],
+        cells: Dict[CellKey, Sequence[int]],
+        resolve: Optional[Callable[[object], object]] = None,
+        rarity_weights: Optional[Dict[str, float]] = None,
+    ) -> "SpawnIndex":
+        """An index over precomputed candidates.
+
+        Species ``i`` is ``ids[i]``, with ref ``i`` and rarity
+        ``rarities[i]``; ``cells`` maps (area id, time slot, weather) to the
+        ascending ids of the species that can appear there.
+        """
+        index = cls((), (), time_slots, weather_types, resolve, rarity_weights)
+        index._species = list(range(len(ids)))
+        index._rarities = list(rarities)
+        index._ids = dict(zip(ids, index._species))
+        for area in areas:
+            area_id = str(area["id"])
+            index._areas[area_id] = tuple(area["habitats"])
+            index._modifiers[area_id] = dict(area.get("rarity_modifiers") or {})
+        index._area_cells = dict(cells)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def species(self, species_id: int) -> Optional[object]:
+        ref = self._species[species_id]
+        return None if ref is None else self._resolve(ref)
+
+    def ref(self, species_id: int) -> Optional[object]:
+        return self._species[species_id]
+
+    def species_ids(self) -> List[int]:
+        return list(self._ids.values())
+
+    def candidate_ids(self, area_id: str, time_slot: str, weather: str) -> array:
+        return self._area_cells.get((area_id, time_slot, weather), array("i"))
+
+    def candidates(self, area_id: str, time_slot: str, weather: str) -> List[object]:
+        species, resolve = self._species, self._resolve
+        ids = self.candidate_ids(area_id, time_slot, weather)
+        return [resolve(species[i]) for i in ids]
+
+    def weight(self, species_id: int, area_id: str) -> float:
+        if self.rarity_weights is None:
+            return 1.0
+        rarity = self._rarities[species_id]
+        modifiers = self._modifiers.get(area_id, {})
+        return self.rarity_weights.get(rarity, 1.0) * modifiers.get(rarity, 1.0)
+
+    def sample(
+        self, rng, area_id: str, time_slot: str, weather: str, k: int
+    ) -> List[object]:
+        """Draw up to ``k`` distinct species, weighted by rarity."""
+        key = (area_id, time_slot, weather)
+        ids = self.candidate_ids(area_id, time_slot, weather)
+        n = len(ids)
+        picked: List[int] = []
+        if n > k:
+            table = self._alias.get(key)
+            if table is None:
+                weights = [self.weight(i, area_id) for i in ids]
+                table = self._alias[key] = build_alias_table(weights)
+            prob, alias = table
+            seen = set()
+            # Drawing with the alias table and rejecting repeats samples
+            # without replacement; the cap only matters when a few species
+            # hold nearly all the weight.
+            for _ in range(16 * k):
+                slot = int(rng.random() * n)
+                index = slot if rng.random() < prob[slot] else alias[slot]
+                if index not in seen:
+                    seen.add(index)
+                    picked.append(ids[index])
+                    if len(picked) == k:
+                        break
+        if len(picked) < min(k, n):
+            picked.extend(self._weighted_order(rng, area_id, ids, picked, k))
+        return [self._resolve(self._species[i]) for i in picked]
+
+    def _weighted_order(
+        self, rng, area_id: str, ids: Sequence[int], exclude: List[int], k: int
+    ) -> List[int]:
+        # Efraimidis-Spirakis keys give a weighted order without replacement.
+        excluded = set(exclude)
+        keyed = [
+            (rng.random() ** (1.0 / self.weight(i, area_id)), i)
+            for i in ids
+            if i not in excluded
+        ]
+        keyed.sort(reverse=True)
+        return [i for _, i in keyed[: k - len(exclude)]]
+
+    def add_bird(self, bird) -> int:
+        return self.add_species(
+            bird.id,
+            bird.habitats,
+            bird.active_times,
+            bird.weather,
+            bird,
+            getattr(bird, "rarity", None),
+        )
+
+    def add_species(
+        self,
+        bird_id: str,
+        habitats: Sequence[str],
+        active_times: Sequence[str],
+        weather_types: Sequence[str],
+        ref: object,
+        rarity: Optional[str] = None,
+    ) -> int:
+        if bird_id in self._ids:
+            raise ValueError(f"species {bird_id!r} is already indexed")
+        species_id = len(self._species)
+        self._species.append(ref)
+        self._rarities.append(rarity)
+        habitats = set(habitats)
+        self._ids[bird_id] = species_id
+        for time_slot in active_times:
+            for weather in weather_types:
+                for habitat in habitats:
+                    self._cells.setdefault(
+                        (time_slot, weather, habitat), array("i")
+                    ).append(species_id)
+                for area_id, area_habitats in self._areas.items():
+                    if habitats.intersection(area_habitats):
+                        key = (area_id, time_slot, weather)
+                        self._area_cells.setdefault(key, array("i")).append(
+                            species_id
+                        )
+                        self._alias.pop(key, None)
+        return species_id
+
+    def add_area(self, area: Dict[str, object]) -> None:
+        area_id = str(area["id"])
+        self._areas[area_id] = tuple(area["habitats"])
+        self._modifiers[area_id] = dict(area.get("rarity_modifiers") or {})
+        self._rebuild_area(area_id)
+
+    def _rebuild_area(self, area_id: str) -> None:
+        habitats = self._areas[area_id]
+        for time_slot in self.time_slots:
+            for weather in self.weather_types:
+                merged = set()
+                for habitat in habitats:
+                    merged.update(self._cells.get((time_slot, weather, habitat), ()))
+                key = (area_id, time_slot, weather)
+                self._alias.pop(key, None)
+                if merged:
+                    self._area_cells[key] = array("i", sorted(merged))
+                else:
+                    self._area_cells.pop(key, None)
@@ -0,0 +1,198 @@
+"""Compact in-memory species records.
+
+A ``Bird`` keeps its scalar fields in slots and shares everything that
+repeats across a catalog: category/size/rarity/temperament strings are
+interned, habitat/time/weather/trait lists are interned tuples, stats are
+a fixed-width array in ``STAT_NAMES`` order and moves are ids into a
+deduplicated move table. Tuples and moves are shared through a
+``SpeciesPool``; each catalog owns one, so a reloaded catalog takes its
+moves with it. ``to_dict`` rebuilds the plain record, field for field.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from catalog_cache import encode_json
+
+
+TIME_SLOTS = ["Dawn", "Midday", "Dusk", "Night"]
+WEATHER_TYPES = ["Clear", "Overcast", "Rain", "Windy", "Fog"]
+STAT_NAMES = ["HP", "Attack", "Special Attack", "Defense", "Special Defense", "Speed"]
+BIRD_FIELDS = (
+    "id",
+    "name",
+    "category",
+    "size",
+    "habitats",
+    "active_times",
+    "weather",
+    "rarity",
+    "temperament",
+    "catch_rate",
+    "traits",
+    "description",
+    "stats",
+    "moves",
+)
+
+
+class MoveTable:
+    """Deduplicated move dicts shared by every species that knows them."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._moves: List[Dict[str, object]] = []
+        self._ids: Dict[bytes, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._moves)
+
+    def __getitem__(self, move_id: int) -> Dict[str, object]:
+        return self._moves[move_id]
+
+    def add(self, move: Dict[str, object]) -> int:
+        key = encode_json(move)
+        move_id = self._ids.get(key)
+        if move_id is None:
+            with self._lock:
+                move_id = self._ids.get(key)
+                if move_id is None:
+                    move_id = self._ids[key] = len(self._moves)
+                    self._moves.append(dict(move))
+        return move_id
+
+
+class SpeciesPool:
+    """Interned tuples and moves shared by the species built with it."""
+
+    def __init__(self) -> None:
+        self.moves = MoveTable()
+        self._tuples: Dict[tuple, tuple] = {}
+
+    def strings(self, values: Iterable[str]) -> Tuple[str, ...]:
+        values = tuple(sys.intern(value) for value in values)
+        return self._tuples.setdefault(values, values)
+
+    def move_ids(self, moves: Sequence[Dict[str, object]]) -> Tuple[int, ...]:
+        ids = tuple(self.moves.add(move) for move in moves)
+        return self._tuples.setdefault(ids, ids)
+
+
+class Bird:
+    __slots__ = (
+        "id",
+        "name",
+        "category",
+        "size",
+        "rarity",
+        "temperament",
+        "catch_rate",
+        "description",
+        "stat_values",
+        "move_ids",
+        "_pool",
+        "_habitats",
+        "_active_times",
+        "_weather",
+        "_traits",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        category: str,
+        size: str,
+        habitats: Sequence[str],
+        active_times: Sequence[str],
+        weather: Sequence[str],
+        rarity: str,
+        temperament: str,
+        catch_rate: int,
+        traits: Sequence[str],
+        description: str,
+        stats: Dict[str, int],
+        moves: Sequence[Dict[str, object]],
+        pool: Optional[SpeciesPool] = None,
+    ) -> None:
+        pool = self._pool = pool or SpeciesPool()
+        self.id = id
+        self.name = name
+        self.category = sys.intern(category)
+        self.size = sys.intern(size)
+        self.rarity = sys.intern(rarity)
+        self.temperament = sys.intern(temperament)
+        self.catch_rate = catch_rate
+        self.description = description
+        self._habitats = pool.strings(habitats)
+        self._active_times = pool.strings(active_times)
+        self._weather = pool.strings(weather)
+        self._traits = pool.strings(traits)
+        self.stat_values = array("i", (stats.get(name, 0) for name in STAT_NAMES))
+        self.move_ids = pool.move_ids(moves)
+
+    @property
+    def habitats(self) -> List[str]:
+        return list(self._habitats)
+
+    @property
+    def active_times(self) -> List[str]:
+        return list(self._active_times)
+
+    @property
+    def weather(self) -> List[str]:
+        return list(self._weather)
+
+    @property
+    def traits(self) -> List[str]:
+        return list(self._traits)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(zip(STAT_NAMES, self.stat_values))
+
+    @property
+    def moves(self) -> List[Dict[str, object]]:
+        """The shared move dicts; treat them as read-only."""
+        moves = self._pool.moves
+        return [moves[move_id] for move_id in self.move_ids]
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "category": self.category,
+            "size": self.size,
+            "habitats": list(self._habitats),
+            "active_times": list(self._active_times),
+            "weather": list(self._weather),
+            "rarity": self.rarity,
+            "temperament": self.temperament,
+            "catch_rate": self.catch_rate,
+            "traits": list(self._traits),
+            "description": self.description,
+            "stats": self.stats,
+            "moves": [dict(move) for move in self.moves],
+        }
+
+    def __reduce__(self):
+        # Move ids only mean something inside their pool.
+        return _bird_from_record, (self.to_dict(),)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Bird):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Bird(id={self.id!r}, name={self.name!r})"
+
+
+def _bird_from_record(record: Dict[str, object]) -> Bird:
+    return Bird(**record)
@@ -0,0 +1,526 @@
+"""Species catalog compiled from JSON sources into a memory-mapped file.
+
+``catalog/birds.json`` and ``catalog/areas.json`` are the editable sources.
+They are validated and compiled into ``catalog/catalog.bin``, which holds the
+species as one compact JSON array (byte-identical to the API encoding) with
+an offset per record, plus columns for ids and search terms and the indexes
+derived from them: each area's spawn candidates per time slot and weather,
+a posting list per search term and each stat's species in value order. The
+compiled file is mapped read-only, so forked workers share its pages, a new
+catalog generation is built from views of it without a pass over the
+species, responses are served from slices of it, and ``Bird`` objects are
+only built for the species a request actually touches.
+
+Usage: python species_catalog.py build
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from catalog_cache import encode_json
+from search_index import LIST_FIELDS, SEARCH_FIELDS, TERM_FIELDS
+from species import (
+    BIRD_FIELDS,
+    STAT_NAMES,
+    TIME_SLOTS,
+    WEATHER_TYPES,
+    Bird,
+    SpeciesPool,
+)
+
+
+RARITIES = ["common", "uncommon", "rare"]
+RARITY_WEIGHTS = {"common": 60.0, "uncommon": 30.0, "rare": 10.0}
+MOVE_CATEGORIES = ["physical", "special"]
+MOVE_EFFECTS = ["heal", "buff"]
+
+CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog")
+BIRDS_SOURCE = os.path.join(CATALOG_DIR, "birds.json")
+AREAS_SOURCE = os.path.join(CATALOG_DIR, "areas.json")
+COMPILED_PATH = os.path.join(CATALOG_DIR, "catalog.bin")
+
+MAGIC = b"BIRDCAT\x00"
+VERSION = 6
+SECTIONS = (
+    "meta",
+    "offsets",
+    "ids",
+    "rarities",
+    "stat_totals",
+    "term_ids",
+    "list_offsets",
+    "list_terms",
+    "stats",
+    "spawn_offsets",
+    "spawn_cells",
+    "posting_offsets",
+    "postings",
+    "stat_order",
+    "stat_sorted",
+    "records",
+)
+HEADER = struct.Struct("<8sII" + "QQ" * len(SECTIONS) + "16s")
+
+
+class CatalogError(ValueError):
+    pass
+
+
+def _require(condition: bool, where: str, message: str) -> None:
+    if not condition:
+        raise CatalogError(f"{where}: {message}")
+
+
+def _is_str_list(value: object, allowed: Optional[Sequence[str]] = None) -> bool:
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(item, str) and item for item in value)
+        and (allowed is None or all(item in allowed for item in value))
+    )
+
+
+def validate_bird(record: Dict[str, object]) -> None:
+    _require(isinstance(record, dict), "bird", "must be an object")
+    where = f"bird {record.get('id')!r}"
+    missing = set(BIRD_FIELDS) - set(record)
+    extra = set(record) - set(BIRD_FIELDS)
+    _require(not missing, where, f"missing fields {sorted(missing)}")
+    _require(not extra, where, f"unknown fields {sorted(extra)}")
+    for field in ("id", "name", "category", "size", "temperament", "description"):
+        _require(
+            isinstance(record[field], str) and record[field],
+            where,
+            f"{field} must be a string",
+        )
+    _require(
+        _is_str_list(record["habitats"]), where, "habitats must be a list of strings"
+    )
+    _require(
+        _is_str_list(record["active_times"], TIME_SLOTS),
+        where,
+        f"active_times must be from {TIME_SLOTS}",
+    )
+    _require(
+        _is_str_list(record["weather"], WEATHER_TYPES),
+        where,
+        f"weather must be from {WEATHER_TYPES}",
+    )
+    _require(isinstance(record["traits"], list), where, "traits must be a list")
+    _require(record["rarity"] in RARITIES, where, f"rarity must be one of {RARITIES}")
+    catch_rate = record["catch_rate"]
+    _require(
+        isinstance(catch_rate, int) and 1 <= catch_rate <= 100,
+        where,
+        "catch_rate must be 1-100",
+    )
+    stats = record["stats"]
+    _require(
+        isinstance(stats, dict)
+        and set(stats) == set(STAT_NAMES)
+        and all(isinstance(value, int) and value >= 0 for value in stats.values()),
+        where,
+        f"stats must map {STAT_NAMES} to non-negative ints",
+    )
+    moves = record["moves"]
+    _require(isinstance(moves, list) and moves, where, "moves must be a non-empty list")
+    for move in moves:
+        _require(
+            isinstance(move, dict) and isinstance(move.get("name"), str),
+            where,
+            "moves need a name",
+        )
+        _require(
+            isinstance(move.get("power"), int) and move["power"] >= 0,
+            where,
+            f"{move['name']}: bad power",
+        )
+        _require(
+            move.get("category") in MOVE_CATEGORIES,
+            where,
+            f"{move['name']}: bad category",
+        )
+        effect = move.get("effect")
+        _require(
+            effect is None or effect in MOVE_EFFECTS,
+            where,
+            f"{move['name']}: bad effect",
+        )
+        if effect == "buff":
+            _require(
+                move.get("stat") in STAT_NAMES, where, f"{move['name']}: bad buff stat"
+            )
+
+
+def validate_area(area: Dict[str, object]) -> None:
+    _require(isinstance(area, dict), "area", "must be an object")
+    where = f"area {area.get('id')!r}"
+    for field in ("id", "name", "icon", "background"):
+        _require(
+            isinstance(area.get(field), str) and area[field],
+            where,
+            f"{field} must be a string",
+        )
+    _require(
+        _is_str_list(area.get("habitats")), where, "habitats must be a list of strings"
+    )
+    modifiers = area.get("rarity_modifiers", {})
+    _require(
+        isinstance(modifiers, dict)
+        and all(
+            rarity in RARITIES
+            and isinstance(value, (int, float))
+            and not isinstance(value, bool)
+            and value > 0
+            for rarity, value in modifiers.items()
+        ),
+        where,
+        f"rarity_modifiers must map {RARITIES} to positive numbers",
+    )
+
+
+def _cell_index(area_index: int, time_slot: str, weather: str) -> int:
+    return (
+        area_index * len(TIME_SLOTS) + TIME_SLOTS.index(time_slot)
+    ) * len(WEATHER_TYPES) + WEATHER_TYPES.index(weather)
+
+
+def _flatten(runs: Iterable[Sequence[int]]) -> Tuple[array, array]:
+    """Runs of ints as one flat column plus the offset where each starts."""
+    offsets = array("I", [0])
+    flat = array("I")
+    for run in runs:
+        flat.extend(run)
+        offsets.append(len(flat))
+    return offsets, flat
+
+
+def _padded(block: bytes) -> bytes:
+    return block + b"\x00" * (-len(block) % 8)
+
+
+def compile_catalog(
+    birds: List[Dict[str, object]], areas: List[Dict[str, object]], path: str
+) -> None:
+    seen = set()
+    for record in birds:
+        validate_bird(record)
+        _require(record["id"] not in seen, f"bird {record['id']!r}", "duplicate id")
+        seen.add(record["id"])
+    for area in areas:
+        validate_area(area)
+
+    # Search columns: a term id per species for each term field, and for
+    # each list field a run of term ids per species located by an offsets
+    # column. Term ids number a field's values in order of first use, and
+    # each term gets the posting list of species that have it.
+    terms: Dict[str, Dict[str, int]] = {field: {} for field in SEARCH_FIELDS}
+    postings: Dict[str, List[List[int]]] = {field: [] for field in SEARCH_FIELDS}
+    term_ids = array("H")
+    for field in TERM_FIELDS:
+        vocabulary, lists = terms[field], postings[field]
+        for doc, r in enumerate(birds):
+            term = vocabulary.setdefault(r[field], len(vocabulary))
+            if term == len(lists):
+                lists.append([])
+            lists[term].append(doc)
+            term_ids.append(term)
+    list_offsets = array("I", [0])
+    list_terms = array("H")
+    for field in LIST_FIELDS:
+        vocabulary, lists = terms[field], postings[field]
+        for doc, r in enumerate(birds):
+            for value in dict.fromkeys(r[field]):
+                term = vocabulary.setdefault(value, len(vocabulary))
+                if term == len(lists):
+                    lists.append([])
+                lists[term].append(doc)
+                list_terms.append(term)
+            list_offsets.append(len(list_terms))
+    posting_offsets, posting_docs = _flatten(
+        docs for field in SEARCH_FIELDS for docs in postings[field]
+    )
+    # Each stat's species ordered by value, ties in catalog order.
+    stat_order = array("I")
+    stat_sorted = array("i")
+    for name in STAT_NAMES:
+        values = [r["stats"][name] for r in birds]
+        docs = sorted(range(len(birds)), key=values.__getitem__)
+        stat_order.extend(docs)
+        stat_sorted.extend(values[doc] for doc in docs)
+
+    # Spawn candidates: for every area, time slot and weather (in that
+    # nesting order) the species active then that share one of the area's
+    # habitats.
+    cells: List[List[int]] = [
+        [] for _ in range(len(areas) * len(TIME_SLOTS) * len(WEATHER_TYPES))
+    ]
+    area_habitats = [set(area["habitats"]) for area in areas]
+    for position, r in enumerate(birds):
+        for area_index, habitats in enumerate(area_habitats):
+            if habitats.isdisjoint(r["habitats"]):
+                continue
+            for time_slot in r["active_times"]:
+                for weather in r["weather"]:
+                    cells[_cell_index(area_index, time_slot, weather)].append(position)
+    spawn_offsets, spawn_cells = _flatten(cells)
+
+    encoded = [encode_json(record) for record in birds]
+    # Record i spans offsets[i] up to the byte before offsets[i + 1], which
+    # is its comma or the closing bracket.
+    offsets = array("Q", [1])
+    for blob in encoded:
+        offsets.append(offsets[-1] + len(blob) + 1)
+    sections = {
+        "meta": encode_json(
+            {
+                "time_slots": TIME_SLOTS,
+                "weather_types": WEATHER_TYPES,
+                "areas": areas,
+                "terms": {field: list(values) for field, values in terms.items()},
+            }
+        ),
+        "offsets": offsets.tobytes(),
+        "ids": "\n".join(record["id"] for record in birds).encode(),
+        "rarities": bytes(RARITIES.index(r["rarity"]) for r in birds),
+        "stat_totals": array("I", (sum(r["stats"].values()) for r in birds)).tobytes(),
+        "term_ids": term_ids.tobytes(),
+        "list_offsets": list_offsets.tobytes(),
+        "list_terms": list_terms.tobytes(),
+        "stats": array(
+            "i", (r["stats"][name] for name in STAT_NAMES for r in birds)
+        ).tobytes(),
+        "spawn_offsets": spawn_offsets.tobytes(),
+        "spawn_cells": spawn_cells.tobytes(),
+        "posting_offsets": posting_offsets.tobytes(),
+        "postings": posting_docs.tobytes(),
+        "stat_order": stat_order.tobytes(),
+        "stat_sorted": stat_sorted.tobytes(),
+        "records": b"[" + b",".join(encoded) + b"]",
+    }
+    body = b""
+    positions: List[int] = []
+    for name in SECTIONS:
+        positions.extend((HEADER.size + len(body), len(sections[name])))
+        body += _padded(sections[name])
+    checksum = hashlib.blake2b(body, digest_size=16).digest()
+    header = HEADER.pack(MAGIC, VERSION, len(birds), *positions, checksum)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(header + body)
+    os.replace(tmp_path, path)
+
+
+class SpeciesCatalog:
+    """Read-only mapped catalog with lazily materialized ``Bird`` records.
+
+    Species are addressed by their position in the compiled file, which is
+    also the order of iteration and indexing. Materialized species share
+    moves and tuples through the catalog's own pool, which goes away with
+    the catalog.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        _require(len(view) >= HEADER.size, path, "truncated header")
+        magic, version, count, *positions, checksum = HEADER.unpack_from(view)
+        _require(magic == MAGIC, path, "not a compiled bird catalog")
+        _require(version == VERSION, path, f"unsupported version {version}")
+        digest = hashlib.blake2b(view[HEADER.size :], digest_size=16).digest()
+        _require(digest == checksum, path, "checksum mismatch")
+        sections = {}
+        for index, name in enumerate(SECTIONS):
+            start, length = positions[2 * index : 2 * index + 2]
+            _require(start + length <= len(view), path, f"section {name} out of bounds")
+            sections[name] = view[start : start + length]
+        self._offsets = sections["offsets"].cast("Q")
+        _require(
+            len(self._offsets) == count + 1, path, "offset table does not match count"
+        )
+        _require(
+            self._offsets[-1] == len(sections["records"]) or not count,
+            path,
+            "record table does not match offsets",
+        )
+        meta = json.loads(bytes(sections["meta"]))
+        self.areas: List[Dict[str, object]] = meta["areas"]
+        self._terms: Dict[str, List[str]] = meta["terms"]
+        self.checksum = checksum
+        # The species as one JSON array, in catalog order.
+        self.body = sections["records"]
+        self._rarities = sections["rarities"]
+        self._stat_totals = sections["stat_totals"].cast("I")
+        self._term_ids = sections["term_ids"].cast("H")
+        self._list_offsets = sections["list_offsets"].cast("I")
+        self._list_terms = sections["list_terms"].cast("H")
+        self._stats = sections["stats"].cast("i")
+        self._spawn_offsets = sections["spawn_offsets"].cast("I")
+        self._spawn_cells = sections["spawn_cells"].cast("I")
+        self._posting_offsets = sections["posting_offsets"].cast("I")
+        self._postings = sections["postings"].cast("I")
+        self._stat_order = sections["stat_order"].cast("I")
+        self._stat_sorted = sections["stat_sorted"].cast("i")
+        _require(
+            len(self._spawn_offsets)
+            == len(self.areas) * len(TIME_SLOTS) * len(WEATHER_TYPES) + 1,
+            path,
+            "spawn table does not match areas",
+        )
+        self.ids: List[str] = (
+            bytes(sections["ids"]).decode().split("\n") if count else []
+        )
+        self._count = count
+        self._materialized: Dict[int, Bird] = {}
+        self._pool = SpeciesPool()
+        self._index = {
+            bird_id: position for position, bird_id in enumerate(self.ids)
+        }
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> Bird:
+        return self.at(range(self._count)[index])
+
+    def __iter__(self) -> Iterator[Bird]:
+        for position in range(self._count):
+            yield self.at(position)
+
+    def position(self, bird_id: str) -> Optional[int]:
+        return self._index.get(bird_id)
+
+    def get(self, bird_id: str) -> Optional[Bird]:
+        position = self._index.get(bird_id)
+        return None if position is None else self.at(position)
+
+    def at(self, position: int) -> Bird:
+        bird = self._materialized.get(position)
+        if bird is None:
+            record = json.loads(self.raw(position))
+            validate_bird(record)
+            bird = self._materialized[position] = Bird(**record, pool=self._pool)
+        return bird
+
+    def stat_total(self, position: int) -> int:
+        """Sum of base stats, read from the mapped column."""
+        return self._stat_totals[position]
+
+    def fragment(self, position: int) -> memoryview:
+        """A species' JSON as a slice of the mapped file, without copying."""
+        return self.body[self._offsets[position] : self._offsets[position + 1] - 1]
+
+    def raw(self, position: int) -> bytes:
+        return bytes(self.fragment(position))
+
+    def search_columns(self) -> Dict[str, object]:
+        """The ``SearchIndex`` arguments, as views of the mapped columns."""
+        count = self._count
+        offsets, docs = self._posting_offsets, self._postings
+        postings: Dict[str, List[memoryview]] = {}
+        term = 0
+        for field in SEARCH_FIELDS:
+            postings[field] = [
+                docs[offsets[term + index] : offsets[term + index + 1]]
+                for index in range(len(self._terms[field]))
+            ]
+            term += len(self._terms[field])
+
+        def column(values: memoryview, index: int, extra: int = 0) -> memoryview:
+            return values[index * count : (index + 1) * count + extra]
+
+        return {
+            "ids": self.ids,
+            "terms": self._terms,
+            "term_ids": {
+                field: column(self._term_ids, index)
+                for index, field in enumerate(TERM_FIELDS)
+            },
+            "term_lists": {
+                field: (column(self._list_offsets, index, 1), self._list_terms)
+                for index, field in enumerate(LIST_FIELDS)
+            },
+            "stats": {
+                name: column(self._stats, index)
+                for index, name in enumerate(STAT_NAMES)
+            },
+            "postings": postings,
+            "sorted_stats": {
+                name: (
+                    column(self._stat_sorted, index),
+                    column(self._stat_order, index),
+                )
+                for index, name in enumerate(STAT_NAMES)
+            },
+        }
+
+    def spawn_cells(self) -> Dict[Tuple[str, str, str], memoryview]:
+        """Positions of the species that can spawn per (area, time slot,
+        weather), ascending, as views of the mapped column; empty cells are
+        left out."""
+        cells = {}
+        for area_index, area in enumerate(self.areas):
+            for time_slot in TIME_SLOTS:
+                for weather in WEATHER_TYPES:
+                    index = _cell_index(area_index, time_slot, weather)
+                    start, end = self._spawn_offsets[index : index + 2]
+                    if start < end:
+                        cells[(area["id"], time_slot, weather)] = self._spawn_cells[
+                            start:end
+                        ]
+        return cells
+
+    def rarities(self) -> List[str]:
+        """Every species' rarity, in catalog order."""
+        return [RARITIES[rarity] for rarity in self._rarities]
+
+
+def _read_json(path: str) -> List[Dict[str, object]]:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except ValueError as error:
+        raise CatalogError(f"{path}: {error}") from error
+
+
+def build(path: str = COMPILED_PATH) -> None:
+    compile_catalog(_read_json(BIRDS_SOURCE), _read_json(AREAS_SOURCE), path)
+
+
+def _compiled_version(path: str) -> Optional[int]:
+    try:
+        with open(path, "rb") as handle:
+            header = handle.read(12)
+    except OSError:
+        return None
+    if len(header) < 12 or header[:8] != MAGIC:
+        return None
+    return struct.unpack("<I", header[8:12])[0]
+
+
+def load_catalog(path: str = COMPILED_PATH) -> SpeciesCatalog:
+    """Map the compiled catalog, rebuilding it first if the sources are newer
+    or it was compiled by an older format version."""
+    sources = (BIRDS_SOURCE, AREAS_SOURCE)
+    if path == COMPILED_PATH and all(os.path.exists(source) for source in sources):
+        built = os.path.getmtime(path) if os.path.exists(path) else -1
+        stale = built < max(os.path.getmtime(source) for source in sources)
+        if stale or _compiled_version(path) != VERSION:
+            build(path)
+    return SpeciesCatalog(path)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["build"]:
+        sys.exit(__doc__.strip().splitlines()[-1])
+    build()
+    print(f"compiled {len(load_catalog())} species into {COMPILED_PATH}")
@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from box import Box
+from changelog import ChangeLog
+
+
+# Box entries, dex and levels grow with a player's collection, so each entry
+# is a row of its own and a capture or release writes only the rows it
+# touches. The rest of the state is small and kept as one JSON document.
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS player_state ("
+    "session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, state TEXT NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS player_box ("
+    "session_id TEXT NOT NULL, entry_id INTEGER NOT NULL, bird_id TEXT NOT NULL, "
+    "PRIMARY KEY (session_id, entry_id)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS player_dex ("
+    "session_id TEXT NOT NULL, bird_id TEXT NOT NULL, "
+    "PRIMARY KEY (session_id, bird_id)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS player_levels ("
+    "session_id TEXT NOT NULL, bird_id TEXT NOT NULL, level INTEGER NOT NULL, "
+    "PRIMARY KEY (session_id, bird_id)) WITHOUT ROWID",
+    # Leaderboard scores, numbered in commit order so that every worker can
+    # pick up the rows written since it last looked.
+    "CREATE TABLE IF NOT EXISTS player_scores ("
+    "session_id TEXT PRIMARY KEY, seq INTEGER NOT NULL, scores TEXT NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS player_scores_seq ON player_scores (seq)",
+)
+COLLECTION_TABLES = ("player_box", "player_dex", "player_levels")
+SELECT_VERSION = "SELECT version FROM player_state WHERE session_id = ?"
+SELECT_STATE = "SELECT state FROM player_state WHERE session_id = ?"
+SELECT_BOX = (
+    "SELECT entry_id, bird_id FROM player_box WHERE session_id = ? ORDER BY entry_id"
+)
+SELECT_DEX = "SELECT bird_id FROM player_dex WHERE session_id = ?"
+SELECT_LEVELS = "SELECT bird_id, level FROM player_levels WHERE session_id = ?"
+UPSERT_STATE = (
+    "INSERT INTO player_state (session_id, version, state) VALUES (?, ?, ?) "
+    "ON CONFLICT (session_id) DO UPDATE SET version = excluded.version, "
+    "state = excluded.state"
+)
+INSERT_BOX = "INSERT INTO player_box (session_id, entry_id, bird_id) VALUES (?, ?, ?)"
+DELETE_BOX = "DELETE FROM player_box WHERE session_id = ? AND entry_id = ?"
+INSERT_DEX = (
+    "INSERT INTO player_dex (session_id, bird_id) VALUES (?, ?) "
+    "ON CONFLICT (session_id, bird_id) DO NOTHING"
+)
+UPSERT_LEVEL = (
+    "INSERT INTO player_levels (session_id, bird_id, level) VALUES (?, ?, ?) "
+    "ON CONFLICT (session_id, bird_id) DO UPDATE SET level = excluded.level"
+)
+DELETE_LEVEL = "DELETE FROM player_levels WHERE session_id = ? AND bird_id = ?"
+DELETE_SESSION = "DELETE FROM {table} WHERE session_id = ?"
+# Writers hold the database write lock, so seqs commit in increasing order.
+UPSERT_SCORES = (
+    "INSERT INTO player_scores (session_id, seq, scores) "
+    "VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM player_scores), ?) "
+    "ON CONFLICT (session_id) DO UPDATE SET seq = excluded.seq, "
+    "scores = excluded.scores"
+)
+SELECT_SCORES = (
+    "SELECT seq, session_id, scores FROM player_scores WHERE seq > ? ORDER BY seq"
+)
+
+
+def encode_state(state: Dict[str, object]) -> str:
+    """The state without its collection, which is stored row by row."""
+    document = {
+        key: value
+        for key, value in state.items()
+        if key not in ("box", "dex", "levels")
+    }
+    document["box_next_id"] = state["box"].next_id
+    document["changes"] = state["changes"].to_dict()
+    return json.dumps(document, separators=(",", ":"))
+
+
+def _fingerprint(state: Dict[str, object]) -> Tuple[object, ...]:
+    # Every progress mutation bumps the change log version; the remaining
+    # fields cover the clock, weather, direct edits that bypass the log and
+    # collection counters rebuilt for a new catalog.
+    return (
+        state["changes"].version,
+        state["time_index"],
+        state["net_attempts"],
+        tuple(state["area_weather"].items()),
+        len(state["team"]),
+        len(state["box"]),
+        len(state["dex"]),
+        len(state["levels"]),
+        (state.get("progress") or {}).get("catalog"),
+        tuple((state.get("scores") or {}).items()),
+    )
+
+
+class SQLiteStateStore:
+    """Player state shared by every worker process through SQLite in WAL mode.
+
+    Drop-in replacement for ``SessionStore``. A request that mutates state
+    runs inside a ``BEGIN IMMEDIATE`` transaction, so a capture or release
+    reads and writes the row atomically with respect to all other workers;
+    a read-only request runs in a deferred transaction and never takes the
+    database write lock. Every thread keeps its own connection (reopened
+    after a fork), and decoded states are cached per process by row
+    version, so a session that was not touched by another worker is reused
+    without decoding; threads of one process take turns on a session
+    through striped locks. Nothing is written unless the request changed
+    something, and then only the collection rows named by the player's
+    change log are. A state's ``scores`` are also kept in a row of their
+    own whenever they change, for ``scores_since``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        factory: Callable[[str], Dict[str, object]],
+        cache_size: int = 10_000,
+        timeout: float = 30.0,
+        stripes: int = 64,
+    ) -> None:
+        self.path = path
+        self._factory = factory
+        self._cache_size = cache_size
+        self._timeout = timeout
+        self._local = threading.local()
+        self._cache: "OrderedDict[str, Tuple[int, Dict[str, object]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._session_locks = [threading.Lock() for _ in range(stripes)]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self._timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def _cached(self, session_id: str, version: int) -> Optional[Dict[str, object]]:
+        with self._cache_lock:
+            entry = self._cache.get(session_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._cache.move_to_end(session_id)
+            return entry[1]
+
+    def _remember(
+        self, session_id: str, version: int, state: Dict[str, object]
+    ) -> None:
+        with self._cache_lock:
+            self._cache[session_id] = (version, state)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget(self, session_id: str) -> None:
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
+
+    @contextmanager
+    def session(
+        self, session_id: str, write: bool = True
+    ) -> Iterator[Dict[str, object]]:
+        """The session's state for the duration of a request.
+
+        With ``write`` false the request is expected to only read. Should it
+        still change the state (a first visit, or collection counters
+        rebuilt for a new catalog), the change is saved only if no other
+        worker wrote the row in the meantime; such changes are derived and
+        are simply made again on a later request.
+        """
+        lock = self._session_locks[
+            zlib.crc32(session_id.encode()) % len(self._session_locks)
+        ]
+        with lock:
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                row = connection.execute(SELECT_VERSION, (session_id,)).fetchone()
+                if row is None:
+                    # A dropped and recreated row must not reuse a version that
+                    # another process may still have cached.
+                    version = time.time_ns()
+                    state = self._factory(session_id)
+                else:
+                    version = row[0]
+                    state = self._cached(session_id, version)
+                    if state is None:
+                        state = self._read(connection, session_id)
+                before = _fingerprint(state)
+                yield state
+                changed = row is None or _fingerprint(state) != before
+                # A new row has no collection rows to update yet.
+                known = before if row is not None else None
+                if changed and write:
+                    self._write(connection, session_id, version + 1, state, known)
+                connection.execute("COMMIT")
+                if changed and not write:
+                    connection.execute("BEGIN IMMEDIATE")
+                    current = connection.execute(
+                        SELECT_VERSION, (session_id,)
+                    ).fetchone()
+                    if current != row:
+                        # Another worker wrote the row since it was read.
+                        connection.execute("ROLLBACK")
+                        self._forget(session_id)
+                        return
+                    self._write(connection, session_id, version + 1, state, known)
+                    connection.execute("COMMIT")
+            except BaseException:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                # The cached object may hold half-applied changes.
+                self._forget(session_id)
+                raise
+            if changed:
+                version += 1
+            self._remember(session_id, version, state)
+
+    def _read(
+        self, connection: sqlite3.Connection, session_id: str
+    ) -> Dict[str, object]:
+        (text,) = connection.execute(SELECT_STATE, (session_id,)).fetchone()
+        state = json.loads(text)
+        entries = connection.execute(SELECT_BOX, (session_id,)).fetchall()
+        state["box"] = Box.from_dict(
+            {"next_id": state.pop("box_next_id"), "entries": entries}
+        )
+        state["dex"] = {
+            bird_id for (bird_id,) in connection.execute(SELECT_DEX, (session_id,))
+        }
+        state["levels"] = dict(connection.execute(SELECT_LEVELS, (session_id,)))
+        state["changes"] = ChangeLog.from_dict(state["changes"])
+        return state
+
+    def _write(
+        self,
+        connection: sqlite3.Connection,
+        session_id: str,
+        version: int,
+        state: Dict[str, object],
+        before: Optional[Tuple[object, ...]],
+    ) -> None:
+        """Store ``state`` as ``version``; ``before`` is its fingerprint as
+        read from the database (None for a new row).
+
+        Collection rows are updated from the change log entries made since
+        then. A new row, a reset, changes that fell out of the log or edits
+        that bypassed it rewrite the player's collection rows instead.
+        """
+        connection.execute(UPSERT_STATE, (session_id, version, encode_state(state)))
+        scores = state.get("scores")
+        changed = before is None or tuple((scores or {}).items()) != before[9]
+        if scores is not None and changed:
+            connection.execute(
+                UPSERT_SCORES, (session_id, json.dumps(scores, separators=(",", ":")))
+            )
+        changes = None if before is None else state["changes"].since(before[0])
+        if changes is not None and self._apply(
+            connection, session_id, changes, before, state
+        ):
+            return
+        for table in COLLECTION_TABLES:
+            connection.execute(DELETE_SESSION.format(table=table), (session_id,))
+        connection.executemany(
+            INSERT_BOX,
+            (
+                (session_id, entry_id, bird_id)
+                for entry_id, bird_id in state["box"].entries()
+            ),
+        )
+        connection.executemany(
+            INSERT_DEX, ((session_id, bird_id) for bird_id in state["dex"])
+        )
+        connection.executemany(
+            UPSERT_LEVEL,
+            (
+                (session_id, bird_id, level)
+                for bird_id, level in state["levels"].items()
+            ),
+        )
+
+    def _apply(
+        self,
+        connection: sqlite3.Connection,
+        session_id: str,
+        changes: List[Tuple[str, tuple]],
+        before: Tuple[object, ...],
+        state: Dict[str, object],
+    ) -> bool:
+        """Write the logged collection changes; False when they don't account
+        for the collection's new size (an edit bypassed the log)."""
+        box_size, dex_size, level_count = before[5], before[6], before[7]
+        levelled = False
+        for kind, args in changes:
+            if kind == "box_add":
+                connection.execute(INSERT_BOX, (session_id, *args))
+                box_size += 1
+            elif kind == "box_remove":
+                connection.execute(DELETE_BOX, (session_id, args[0]))
+                box_size -= 1
+            elif kind == "dex":
+                connection.execute(INSERT_DEX, (session_id, args[0]))
+                dex_size += 1
+            elif kind == "level":
+                bird_id, level = args
+                if level is None:
+                    connection.execute(DELETE_LEVEL, (session_id, bird_id))
+                else:
+                    connection.execute(UPSERT_LEVEL, (session_id, bird_id, level))
+                levelled = True
+        return (
+            box_size == len(state["box"])
+            and dex_size == len(state["dex"])
+            and (levelled or level_count == len(state["levels"]))
+        )
+
+    def drop(self, session_id: str) -> None:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        for table in ("player_state", *COLLECTION_TABLES):
+            connection.execute(DELETE_SESSION.format(table=table), (session_id,))
+        # Empty scores rather than no row, so other workers see the change.
+        connection.execute(UPSERT_SCORES, (session_id, "{}"))
+        connection.execute("COMMIT")
+        self._forget(session_id)
+
+    def scores_since(
+        self, seq: int
+    ) -> Iterator[Tuple[int, str, Dict[str, Optional[int]]]]:
+        """(seq, session id, scores) of the score rows written after ``seq``,
+        in the order they were written."""
+        rows = self._connection().execute(SELECT_SCORES, (seq,)).fetchall()
+        for row_seq, session_id, scores in rows:
+            yield row_seq, session_id, json.loads(scores)
+
+    def __len__(self) -> int:
+        return (
+            self._connection()
+            .execute("SELECT COUNT(*) FROM player_state")
+            .fetchone()[0]
+        )
+
+    def session_ids(self) -> List[str]:
+        rows = self._connection().execute("SELECT session_id FROM player_state")
+        return [session_id for (session_id,) in rows]
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.pid = None
@@ -1,4 +1,4 @@
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useMemo, useRef, useState } from "react";
 
 const backgroundThemes = {
   forest: "linear-gradient(180deg, #b6e3a1 0%, #6abf69 100%)",
@@ -36,6 +36,8 @@ const weatherIcons = {
   Fog: "🌫️"
 };
 
+const CATALOG_STORAGE_KEY = "birdmon.catalog";
+
 const timeBadges = {
   Dawn: "🌅",
   Midday: "🌞",
@@ -65,6 +67,79 @@ function describeMove(move) {
   return `Power ${move.power ?? 0}`;
 }
 
+function applyPlayerDelta(prev, data) {
+  if (!data.delta) {
+    return data;
+  }
+  if (prev.version !== undefined && data.version <= prev.version) {
+    return prev;
+  }
+  const removed = new Set(data.box_removed);
+  const entries = [];
+  const box = [];
+  (prev.box_entries ?? []).forEach((entryId, index) => {
+    if (!removed.has(entryId)) {
+      entries.push(entryId);
+      box.push(prev.box[index]);
+    }
+  });
+  // New entries take the highest ids, so while pages remain to be loaded
+  // they belong to a later page and arrive with it.
+  const present = new Set(entries);
+  data.box_added.forEach(([entryId, birdId]) => {
+    if (
+      !present.has(entryId) &&
+      (prev.box_cursor == null || entryId <= prev.box_cursor)
+    ) {
+      entries.push(entryId);
+      box.push(birdId);
+    }
+  });
+  const boxCounts = { ...prev.box_counts };
+  Object.entries(data.box_counts).forEach(([birdId, count]) => {
+    if (count) {
+      boxCounts[birdId] = count;
+    } else {
+      delete boxCounts[birdId];
+    }
+  });
+  const levels = { ...prev.levels };
+  Object.entries(data.levels).forEach(([birdId, level]) => {
+    if (level === null) {
+      delete levels[birdId];
+    } else {
+      levels[birdId] = level;
+    }
+  });
+  return {
+    ...prev,
+    version: data.version,
+    team: data.team ?? prev.team,
+    box,
+    box_entries: entries,
+    box_size: data.box_size,
+    box_counts: boxCounts,
+    dex: [...new Set([...prev.dex, ...data.dex_added])],
+    levels
+  };
+}
+
+function appendBoxPage(prev, data) {
+  if (prev.box_cursor == null) {
+    return prev;
+  }
+  const entries = [...prev.box_entries];
+  const box = [...prev.box];
+  const present = new Set(entries);
+  data.box_entries.forEach((entryId, index) => {
+    if (!present.has(entryId)) {
+      entries.push(entryId);
+      box.push(data.box[index]);
+    }
+  });
+  return { ...prev, box, box_entries: entries, box_cursor: data.box_cursor };
+}
+
 export default function App() {
   const [state, setState] = useState(null);
   const [birds, setBirds] = useState([]);
@@ -87,6 +162,12 @@ export default function App() {
   const [battleHighlight, setBattleHighlight] = useState(null);
   const [selectedBattleBird, setSelectedBattleBird] = useState("");
   const [battleTurn, setBattleTurn] = useState("player");
+  const [eventsEnabled, setEventsEnabled] = useState(false);
+  const playerVersion = useRef(undefined);
+
+  useEffect(() => {
+    playerVersion.current = player.version;
+  }, [player.version]);
 
   const teamBirds = useMemo(
     () =>
@@ -99,28 +180,95 @@ export default function App() {
   const boxBirds = useMemo(
     () =>
       player.box
-        .map((id) => birds.find((bird) => bird.id === id))
-        .filter(Boolean),
-    [player.box, birds]
+        .map((id, index) => ({
+          entryId: player.box_entries?.[index],
+          bird: birds.find((bird) => bird.id === id)
+        }))
+        .filter(({ bird }) => bird),
+    [player.box, player.box_entries, birds]
   );
 
   useEffect(() => {
-    Promise.all([fetch("/api/state"), fetch("/api/birds"), fetch("/api/player")])
-      .then(async ([stateRes, birdsRes, playerRes]) => {
-        const [stateData, birdData, playerData] = await Promise.all([
-          stateRes.json(),
-          birdsRes.json(),
-          playerRes.json()
-        ]);
-        setState(stateData);
-        setBirds(birdData);
-        setPlayer(playerData);
+    let cachedCatalog = null;
+    try {
+      cachedCatalog = JSON.parse(localStorage.getItem(CATALOG_STORAGE_KEY));
+    } catch {
+      cachedCatalog = null;
+    }
+    const query = cachedCatalog?.etag
+      ? `?catalogEtag=${encodeURIComponent(cachedCatalog.etag)}`
+      : "";
+    fetch(`/api/bootstrap${query}`)
+      .then((response) => response.json())
+      .then((data) => {
+        let catalog = data.catalog;
+        if (catalog === null) {
+          catalog = cachedCatalog.birds;
+        } else {
+          try {
+            localStorage.setItem(
+              CATALOG_STORAGE_KEY,
+              JSON.stringify({ etag: data.catalog_etag, birds: catalog })
+            );
+          } catch {
+            // Storage full or disabled: the catalog is simply refetched next time.
+          }
+        }
+        setState(data.state);
+        setBirds(catalog);
+        setPlayer(data.player);
+        setEventsEnabled(data.events);
       })
       .catch(() => {
         setMessage("Unable to reach the Aviary server.");
       });
   }, []);
 
+  const refreshPlayer = async () => {
+    const since = playerVersion.current;
+    const playerRes = await fetch(
+      since === undefined ? "/api/player" : `/api/player?since=${since}`
+    );
+    const playerData = await playerRes.json();
+    setPlayer((prev) => applyPlayerDelta(prev, playerData));
+  };
+
+  useEffect(() => {
+    // Only servers that can park idle streams offer them, and a hidden tab
+    // gives its stream back; it catches up through refreshPlayer on return.
+    if (!eventsEnabled) {
+      return undefined;
+    }
+    let events = null;
+    const open = () => {
+      events = new EventSource("/api/events");
+      events.addEventListener("clock", (event) => {
+        setState(JSON.parse(event.data));
+      });
+      events.addEventListener("player", refreshPlayer);
+    };
+    const close = () => {
+      events?.close();
+      events = null;
+    };
+    const onVisibilityChange = () => {
+      if (document.hidden) {
+        close();
+      } else if (!events) {
+        open();
+        refreshPlayer();
+      }
+    };
+    if (!document.hidden) {
+      open();
+    }
+    document.addEventListener("visibilitychange", onVisibilityChange);
+    return () => {
+      document.removeEventListener("visibilitychange", onVisibilityChange);
+      close();
+    };
+  }, [eventsEnabled]);
+
   const handleAdvanceTime = async () => {
     const response = await fetch("/api/advance-time", { method: "POST" });
     const data = await response.json();
@@ -183,9 +331,9 @@ export default function App() {
       location: result.location
     });
     if (result.success) {
-      const playerRes = await fetch("/api/player");
-      const playerData = await playerRes.json();
-      setPlayer(playerData);
+      // The event stream lives on one worker; the capture may have been
+      // handled by another, so don't rely on it to deliver this change.
+      await refreshPlayer();
     } else {
       setMessage("");
     }
@@ -194,138 +342,74 @@ export default function App() {
     }
   };
 
-  const handleRelease = async (birdId) => {
+  const handleRelease = async (entryId) => {
     const response = await fetch("/api/release", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ birdId })
+      body: JSON.stringify({ entryId, since: playerVersion.current })
     });
     const data = await response.json();
-    setPlayer(data);
+    setPlayer((prev) => applyPlayerDelta(prev, data));
     setMessage("Bird released back into the wild.");
   };
 
-  const calculateDamage = (move, attacker, defender, attackerBuffs, defenderBuffs) => {
-    const attackStat =
-      move.category === "special"
-        ? attacker.stats["Special Attack"] + (attackerBuffs["Special Attack"] ?? 0)
-        : attacker.stats["Attack"] + (attackerBuffs["Attack"] ?? 0);
-    const defenseStat =
-      move.category === "special"
-        ? defender.stats["Special Defense"] + (defenderBuffs["Special Defense"] ?? 0)
-        : defender.stats["Defense"] + (defenderBuffs["Defense"] ?? 0);
-    const basePower = move.power ?? 0;
-    const base = basePower * 0.6 + attackStat * 0.3 - defenseStat * 0.25;
-    const variance = 0.85 + Math.random() * 0.3;
-    return Math.max(4, Math.floor(base * variance));
+  const handleLoadMoreBox = async () => {
+    const response = await fetch(`/api/player?cursor=${player.box_cursor}`);
+    const data = await response.json();
+    setPlayer((prev) => appendBoxPage(prev, data));
+    // The page may be newer than the rest of the player; catch up on
+    // releases and level changes made in between.
+    await refreshPlayer();
   };
 
-  const applyMoveEffect = (currentBattle, move, attackerKey) => {
-    const defenderKey = attackerKey === "player" ? "opponent" : "player";
-    const attackerBuffs = currentBattle[`${attackerKey}Buffs`] ?? {};
-    const defenderBuffs = currentBattle[`${defenderKey}Buffs`] ?? {};
-    const attacker = currentBattle[attackerKey];
-    const defender = currentBattle[defenderKey];
-    const nextBattle = { ...currentBattle };
-    const logs = [];
-
-    if (move.effect === "heal") {
-      const amount = move.amount ?? 25;
-      const maxHp = attacker.stats.HP;
-      const healed = Math.min(
-        maxHp,
-        nextBattle[`${attackerKey}Hp`] + amount
-      );
-      nextBattle[`${attackerKey}Hp`] = healed;
-      logs.push(`${attacker.name} restored ${amount} HP!`);
-    }
-
-    if (move.effect === "buff") {
-      const stat = move.stat ?? "Attack";
-      const amount = move.amount ?? 10;
-      nextBattle[`${attackerKey}Buffs`] = {
-        ...attackerBuffs,
-        [stat]: (attackerBuffs[stat] ?? 0) + amount
-      };
-      logs.push(`${attacker.name} boosted ${stat} by ${amount}!`);
+  const handlePlayerMove = async (move) => {
+    if (!battle || battleStatus !== "in-progress" || battleTurn !== "player") {
+      return;
     }
-
-    const damage =
-      (move.power ?? 0) > 0
-        ? calculateDamage(move, attacker, defender, attackerBuffs, defenderBuffs)
-        : 0;
-    if (damage > 0) {
-      nextBattle[`${defenderKey}Hp`] = Math.max(
-        0,
-        nextBattle[`${defenderKey}Hp`] - damage
-      );
-      logs.push(`${attacker.name} hit for ${damage} damage!`);
+    // The server plays the move and the CPU's reply, and awards the level.
+    setBattleTurn("cpu");
+    setBattleHighlight("player");
+    const response = await fetch("/api/battle/turn", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        battleId: battle.id,
+        move: battle.player.moves.indexOf(move)
+      })
+    });
+    const data = await response.json();
+    if (data.error) {
+      setMessage(data.error);
+      setBattleStatus("idle");
+      setBattle(null);
+      return;
     }
-
-    return { nextBattle, logs, damage };
-  };
-
-  const handleCpuMove = (currentBattle) => {
-    if (!currentBattle) {
+    setBattleLog((entries) => [...data.log, ...entries]);
+    setBattle((current) => ({
+      ...current,
+      playerHp: data.player.hp,
+      opponentHp: data.opponent.hp,
+      playerBuffs: data.player.buffs,
+      opponentBuffs: data.opponent.buffs
+    }));
+    if (data.status === "won") {
+      setBattleStatus("won");
+      setBattleHighlight("opponent");
+      setPlayer((prev) => ({
+        ...prev,
+        levels: { ...prev.levels, [battle.player.id]: data.level }
+      }));
       return;
     }
-    const opponentMove =
-      currentBattle.opponent.moves[
-        Math.floor(Math.random() * currentBattle.opponent.moves.length)
-      ];
-    const { nextBattle, logs: moveLogs } = applyMoveEffect(
-      currentBattle,
-      opponentMove,
-      "opponent"
-    );
-    setBattleHighlight("opponent");
-    setBattleLog((entries) => [
-      `${currentBattle.opponent.name} used ${opponentMove.name}!`,
-      ...moveLogs,
-      ...entries
-    ]);
-    setBattle(nextBattle);
-    if (nextBattle.playerHp === 0) {
+    if (data.status === "lost") {
       setBattleStatus("lost");
       setBattleHighlight("player");
       return;
     }
+    setBattleHighlight("opponent");
     setBattleTurn("player");
   };
 
-  const handlePlayerMove = (move) => {
-    if (!battle || battleStatus !== "in-progress" || battleTurn !== "player") {
-      return;
-    }
-    const { nextBattle, logs: moveLogs } = applyMoveEffect(battle, move, "player");
-    setBattleHighlight("player");
-    setBattleLog((entries) => [
-      `${battle.player.name} used ${move.name}!`,
-      ...moveLogs,
-      ...entries
-    ]);
-    setBattle(nextBattle);
-    if (nextBattle.opponentHp === 0) {
-      setBattleStatus("won");
-      setBattleHighlight("opponent");
-      fetch("/api/level-up", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ birdId: battle.player.id })
-      })
-        .then((res) => res.json())
-        .then((data) => {
-          setPlayer((prev) => ({
-            ...prev,
-            levels: { ...prev.levels, [data.birdId]: data.level }
-          }));
-        });
-      return;
-    }
-    setBattleTurn("cpu");
-    setTimeout(() => handleCpuMove(nextBattle), 900);
-  };
-
   const handleStartBattle = async () => {
     if (!selectedBattleBird) {
       setMessage("Choose a bird from your team to start a battle.");
@@ -335,18 +419,25 @@ export default function App() {
     const response = await fetch("/api/battle/start", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ birdId: selectedBattleBird })
+      body: JSON.stringify({
+        birdId: selectedBattleBird,
+        areaId: selectedArea?.id
+      })
     });
     const data = await response.json();
     if (data.error) {
       setMessage(data.error);
       return;
     }
+    const playerBird = { ...data.player, stats: data.player_stats };
+    const opponentBird = { ...data.opponent, stats: data.opponent_stats };
     const nextBattle = {
-      player: data.player,
-      opponent: data.opponent,
-      playerHp: data.player.stats.HP,
-      opponentHp: data.opponent.stats.HP,
+      id: data.battle_id,
+      player: playerBird,
+      opponent: opponentBird,
+      opponentLevel: data.opponent_level,
+      playerHp: playerBird.stats.HP,
+      opponentHp: opponentBird.stats.HP,
       playerBuffs: {},
       opponentBuffs: {}
     };
@@ -470,25 +561,38 @@ export default function App() {
             ))}
           </div>
           <div className="box-panel">
-            <h3>Storage Box</h3>
+            <h3>
+              Storage Box
+              {player.box_size ? (
+                <span className="muted">
+                  {" "}
+                  · {player.box.length} of {player.box_size}
+                </span>
+              ) : null}
+            </h3>
             {boxBirds.length === 0 && (
               <p className="muted">No extras stored yet.</p>
             )}
             <div className="box-grid">
-              {boxBirds.map((bird) => (
-                <div key={bird.id} className="box-item">
+              {boxBirds.map(({ entryId, bird }) => (
+                <div key={entryId} className="box-item">
                   <span>
                     {getBirdIcon(bird.id)} {bird.name}
                   </span>
                   <button
                     className="release-button"
-                    onClick={() => handleRelease(bird.id)}
+                    onClick={() => handleRelease(entryId)}
                   >
                     Release
                   </button>
                 </div>
               ))}
             </div>
+            {player.box_cursor != null && (
+              <button className="secondary load-more" onClick={handleLoadMoreBox}>
+                Load more
+              </button>
+            )}
           </div>
         </section>
       </main>
@@ -625,7 +729,9 @@ export default function App() {
                 </div>
                 <div>
                   <div className="battle-name">{battle.opponent.name}</div>
-                  <div className="battle-meta">CPU Challenger</div>
+                  <div className="battle-meta">
+                    CPU Challenger · Level {battle.opponentLevel}
+                  </div>
                 </div>
                 <div className="hp-bar">
                   <span